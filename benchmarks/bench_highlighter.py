@@ -0,0 +1,167 @@
+"""
+Benchmark do SyntaxHighlighter.apply_highlight: algoritmo antigo (um index/tag_config/
+tag_add por token) contra o atual (índices calculados em Python, um tag_add por tipo).
+
+Uso:
+    python -m benchmarks.bench_highlighter [--lines 5000] [--lang python] [--tk]
+
+Sem --tk usa um widget falso que só registra as chamadas (cada chamada seria uma ida
+ao Tcl); com --tk usa um tkinter.Text de verdade (precisa de display).
+Nos dois casos confere se o resultado final (cor de cada caractere) é o mesmo.
+"""
+import argparse
+import bisect
+import time
+
+from pygments.lexers import get_lexer_by_name
+
+from core.highlighter import SyntaxHighlighter
+
+SAMPLE = '''class Parser{n}(Base):
+    """Docstring da classe {n}."""
+    def parse(self, data, limit={n}):
+        # comentário {n}
+        total = sum(x * 2 for x in data if x > limit)
+        return "resultado: %s" % total
+
+'''
+
+
+class RecordingText:
+    """Imita a API de tags do tkinter.Text e conta as chamadas feitas pelo highlighter."""
+
+    def __init__(self, content):
+        self.content = content
+        self.line_starts = [0] + [i + 1 for i, char in enumerate(content) if char == "\n"]
+        self.calls = {}
+        self.tags = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def get(self, start, end):
+        self._count("get")
+        return self.content
+
+    def tag_names(self):
+        self._count("tag_names")
+        return list(self.tags)
+
+    def tag_delete(self, tag):
+        self._count("tag_delete")
+        self.tags.pop(tag, None)
+
+    def tag_config(self, tag, **options):
+        self._count("tag_config")
+        self.tags.setdefault(tag, {"options": {}, "ranges": []})["options"].update(options)
+
+    def tag_add(self, tag, *indices):
+        self._count("tag_add")
+        ranges = self.tags.setdefault(tag, {"options": {}, "ranges": []})["ranges"]
+        for start, end in zip(indices[::2], indices[1::2]):
+            ranges.append((self._offset(start), self._offset(end)))
+
+    def index(self, expression):
+        # Só o formato usado pelo algoritmo antigo: "linha.coluna + N chars"
+        self._count("index")
+        base, _, rest = expression.partition(" + ")
+        offset = min(self._offset(base) + int(rest.split()[0]), len(self.content))
+        line = bisect.bisect_right(self.line_starts, offset)
+        return f"{line}.{offset - self.line_starts[line - 1]}"
+
+    def _offset(self, index):
+        line, col = (int(part) for part in index.split("."))
+        line = min(line, len(self.line_starts))
+        line_end = self.line_starts[line] - 1 if line < len(self.line_starts) else len(self.content)
+        return min(self.line_starts[line - 1] + col, line_end)
+
+    def colors(self):
+        return char_colors(self.content, (
+            (data["options"].get("foreground"), data["ranges"]) for data in self.tags.values()
+        ))
+
+
+def char_colors(content, tagged_ranges):
+    """Cor final de cada caractere visível (espaços não importam para a aparência)."""
+    colors = [None] * len(content)
+    for color, ranges in tagged_ranges:
+        for start, end in ranges:
+            colors[start:end] = [color] * (end - start)
+    return [color if not char.isspace() else None for char, color in zip(content, colors)]
+
+
+def tk_colors(text, content):
+    """char_colors a partir das tags de um tkinter.Text real."""
+    def offset(index):
+        return text.count("1.0", index, "chars")[0] if text.compare(index, ">", "1.0") else 0
+
+    tagged = []
+    for tag in text.tag_names():
+        if tag == "sel":
+            continue
+        bounds = [offset(index) for index in text.tag_ranges(tag)]
+        tagged.append((text.tag_cget(tag, "foreground"), list(zip(bounds[::2], bounds[1::2]))))
+    return char_colors(content, tagged)
+
+
+def legacy_apply_highlight(highlighter, text_widget, code, lang_name):
+    """O algoritmo anterior, preservado aqui como referência."""
+    for tag in text_widget.tag_names():
+        text_widget.tag_delete(tag)
+    lexer = get_lexer_by_name(lang_name)
+    content = text_widget.get("1.0", "end-1c")
+    start_index = "1.0"
+    for token, value in lexer.get_tokens(content):
+        end_index = text_widget.index(f"{start_index} + {len(value)} chars")
+        token_type = str(token)
+        color = highlighter._get_color_for_tag(token_type)
+        if color:
+            text_widget.tag_config(token_type, foreground=color)
+            text_widget.tag_add(token_type, start_index, end_index)
+        start_index = end_index
+
+
+def run(label, apply, widget, code, lang):
+    start = time.perf_counter()
+    apply(widget, code, lang)
+    elapsed = time.perf_counter() - start
+    calls = sum(widget.calls.values()) if isinstance(widget, RecordingText) else None
+    detail = f" | {calls:,} chamadas ao widget {widget.calls}" if calls is not None else ""
+    print(f"{label:>7}: {elapsed * 1000:9.1f} ms{detail}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do SyntaxHighlighter")
+    parser.add_argument("--lines", type=int, default=5000, help="tamanho aproximado do código (linhas)")
+    parser.add_argument("--lang", default="python")
+    parser.add_argument("--tk", action="store_true", help="usa um tkinter.Text real")
+    args = parser.parse_args(argv)
+
+    code = "".join(SAMPLE.format(n=i) for i in range(max(1, args.lines // 7))).rstrip("\n")
+    highlighter = SyntaxHighlighter()
+    print(f"{code.count(chr(10)) + 1} linhas, {len(code):,} caracteres, linguagem {args.lang}")
+
+    if args.tk:
+        import tkinter as tk
+        root = tk.Tk()
+        widgets = []
+        for label, apply in (("antigo", lambda w, c, l: legacy_apply_highlight(highlighter, w, c, l)),
+                             ("atual", highlighter.apply_highlight)):
+            text = tk.Text(root)
+            text.insert("1.0", code)
+            run(label, apply, text, code, args.lang)
+            widgets.append(text)
+        same = tk_colors(widgets[0], code) == tk_colors(widgets[1], code)
+        root.destroy()
+        print("Mesmo resultado visual:", "sim" if same else "NÃO")
+        return
+
+    legacy = RecordingText(code)
+    run("antigo", lambda w, c, l: legacy_apply_highlight(highlighter, w, c, l), legacy, code, args.lang)
+    current = RecordingText(code)
+    run("atual", highlighter.apply_highlight, current, code, args.lang)
+    print("Mesmo resultado visual:", "sim" if legacy.colors() == current.colors() else "NÃO")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Micro-benchmark do custo por token no SyntaxHighlighter: o caminho antigo
+(str(token) + busca linear de substring em token_colors, get_lexer_by_name a cada
+highlight) contra os métodos atuais do SyntaxHighlighter (_get_color_for_token,
+_ranges_from_tokens e _get_lexer, com memos por objeto de token e lexer por nome).
+
+Uso:
+    python -m benchmarks.bench_token_colors [--lines 5000] [--lang python] [--repeat 5]
+"""
+import argparse
+import time
+
+from pygments.lexers import get_lexer_by_name
+
+from benchmarks.bench_highlighter import SAMPLE
+from core.highlighter import SyntaxHighlighter
+
+
+def legacy_color(token_colors, token_type):
+    """O _get_color_for_token anterior."""
+    for key, color in token_colors.items():
+        if key in token_type: return color
+    return "#ABB2BF"
+
+
+def legacy_ranges(tokens):
+    """O _ranges_from_tokens anterior: str(token) para cada token."""
+    ranges = {}
+    previous_type = None
+    line, col = 1, 0
+    for _, token, value in tokens:
+        start = f"{line}.{col}"
+        newlines = value.count("\n")
+        if newlines:
+            line += newlines
+            col = len(value) - value.rfind("\n") - 1
+        else:
+            col += len(value)
+        if not value or value.isspace():
+            continue
+        end = f"{line}.{col}"
+        token_type = str(token)
+        indices = ranges.setdefault(token_type, [])
+        if token_type == previous_type:
+            indices[-1] = end
+        else:
+            indices.append(start)
+            indices.append(end)
+        previous_type = token_type
+    return ranges
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report(label, old, new, count):
+    print(f"{label:<22} antigo {old * 1e9 / count:8.1f} ns | atual {new * 1e9 / count:8.1f} ns"
+          f" | {old / new:5.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custo por token do SyntaxHighlighter")
+    parser.add_argument("--lines", type=int, default=5000, help="tamanho aproximado do código (linhas)")
+    parser.add_argument("--lang", default="python")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    code = "".join(SAMPLE.format(n=i) for i in range(max(1, args.lines // 7)))
+    highlighter = SyntaxHighlighter(cache_size=0)
+    stream = list(highlighter._get_lexer(args.lang).get_tokens_unprocessed(code))
+    tokens = [token for _, token, _ in stream]
+    print(f"{len(tokens):,} tokens, linguagem {args.lang} (melhor de {args.repeat}, por chamada)")
+
+    # Cor por token
+    colors = highlighter.token_colors
+    old = best_of(args.repeat, lambda: [legacy_color(colors, str(token)) for token in tokens])
+    new = best_of(args.repeat, lambda: [highlighter._get_color_for_token(token) for token in tokens])
+    report("cor do token", old, new, len(tokens))
+
+    # Intervalos por tag (nome da tag para cada token), pelo método real
+    assert legacy_ranges(stream) == highlighter._ranges_from_tokens(stream)
+    old = best_of(args.repeat, lambda: legacy_ranges(stream))
+    new = best_of(args.repeat, lambda: highlighter._ranges_from_tokens(stream))
+    report("intervalos por token", old, new, len(tokens))
+
+    # Lexer por highlight
+    calls = 200
+    old = best_of(args.repeat, lambda: [get_lexer_by_name(args.lang) for _ in range(calls)])
+    new = best_of(args.repeat, lambda: [highlighter._get_lexer(args.lang) for _ in range(calls)])
+    report("lexer por highlight", old, new, calls)
+
+
+if __name__ == "__main__":
+    main()
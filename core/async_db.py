@@ -0,0 +1,128 @@
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDatabase:
+    """
+    Fachada assíncrona sobre Database: as consultas rodam numa thread dedicada
+    (com a conexão própria dessa thread) e os resultados voltam para a thread do Tk
+    por uma fila drenada com root.after(), como em KitImportJob.attach.
+
+    Cada pedido pertence a um canal de um widget (ex: a busca do dashboard). Um pedido
+    novo no mesmo canal torna os anteriores obsoletos: os que ainda não começaram são
+    cancelados e as respostas que chegarem depois são descartadas. Nos pedidos feitos com
+    interrupt=True, a consulta que já está rodando também é interrompida (conn.interrupt()).
+    """
+
+    def __init__(self, db, root, interval=15):
+        self.db = db
+        self.root = root
+        self.interval = interval
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="codekit-db")
+        self._done = queue.Queue()
+        self._latest = {}       # (widget, canal) -> (número do pedido, future, interrupt)
+        self._pending = 0
+        self._polling = False
+
+        # Pedido rodando agora na thread do banco: (canal, número, conexão), ver _interrupt
+        self._running = None
+        self._running_lock = threading.Lock()
+
+    def request(self, widget, channel, fn, *args, on_result=None, on_error=None, interrupt=False):
+        """
+        Executa fn(*args) na thread do banco e chama on_result(resultado) ou
+        on_error(exceção) na thread do Tk, se este ainda for o pedido mais recente
+        do canal e o widget ainda existir. Deve ser chamado na thread do Tk.
+        Com interrupt=True (ex: buscas), um pedido mais novo ou cancel() interrompem
+        a consulta deste se ela já estiver rodando, liberando a thread do banco.
+        """
+        key = (str(widget), channel)
+        self._supersede(key)
+        number = self._latest.get(key, (0,))[0] + 1
+
+        future = self._executor.submit(self._run, key, number, fn, args)
+        self._latest[key] = (number, future, interrupt)
+        self._pending += 1
+        future.add_done_callback(
+            lambda f: self._done.put((key, number, widget, f, on_result, on_error))
+        )
+        self._schedule_drain()
+        return future
+
+    def cancel(self, widget, channel):
+        """Descarta o pedido em andamento do canal (ex: ao sair da tela)."""
+        key = (str(widget), channel)
+        if self._supersede(key):
+            self._latest[key] = (self._latest[key][0] + 1, None, False)
+
+    def _supersede(self, key):
+        """Cancela (ou, se pedido com interrupt, interrompe) o último pedido do canal. True se havia um."""
+        number, previous, interrupt = self._latest.get(key, (0, None, False))
+        if previous is None:
+            return False
+        if not previous.cancel() and interrupt:
+            self._interrupt(key, number)
+        return True
+
+    def _run(self, key, number, fn, args):
+        # Roda na thread do banco: registra o pedido para que _interrupt saiba qual consulta para
+        conn = self.db.get_connection()
+        with self._running_lock:
+            self._running = (key, number, conn)
+        try:
+            return fn(*args)
+        finally:
+            with self._running_lock:
+                self._running = None
+
+    def _interrupt(self, key, number):
+        """
+        Interrompe a consulta do pedido, se é ele que está rodando: a consulta em andamento
+        falha com sqlite3.OperationalError ("interrupted") e a resposta, já obsoleta, é descartada.
+        O lock impede que a interrupção atinja o pedido seguinte.
+        """
+        with self._running_lock:
+            if self._running is not None and self._running[:2] == (key, number):
+                self._running[2].interrupt()
+
+    def shutdown(self):
+        """Encerra a thread do banco, abandonando os pedidos que ainda não começaram."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _schedule_drain(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.interval, self._drain)
+
+    def _drain(self):
+        while True:
+            try:
+                key, number, widget, future, on_result, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+
+            latest = self._latest.get(key)
+            if latest is None or latest[0] != number or future.cancelled():
+                continue # Resposta obsoleta: já existe um pedido mais novo
+            del self._latest[key]
+            try:
+                if not widget.winfo_exists():
+                    continue
+            except tk.TclError:
+                continue
+
+            error = future.exception()
+            if error is not None:
+                if on_error: on_error(error)
+                else: print(f"Erro no banco de dados: {error}")
+            elif on_result:
+                on_result(future.result())
+
+        if self._pending > 0:
+            self.root.after(self.interval, self._drain)
+        else:
+            self._polling = False
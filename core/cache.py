@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+# Estatísticas de uso de um LRUCache
+CacheStats = namedtuple("CacheStats", ["hits", "misses", "size", "maxsize"])
+
+# Marca de "chave ausente" (None é um valor válido no cache)
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Cache limitado com descarte do item usado há mais tempo (LRU).
+    Seguro entre threads; conta acertos e faltas para medir sua eficácia.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Retorna o valor em cache ou calcula com compute() e guarda o resultado."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self.hits, self.misses, len(self._data), self.maxsize)
+
+    def __len__(self):
+        return len(self._data)
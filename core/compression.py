@@ -0,0 +1,49 @@
+import hashlib
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Marcadores de formato gravados em snippet_contents.encoding
+PLAIN = "plain"
+ZLIB = "zlib"
+ZSTD = "zstd"
+
+
+def content_hash(code):
+    """Chave de deduplicação dos corpos em snippet_contents (SHA-256 do texto em UTF-8)."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def encode_body(code, threshold=None):
+    """
+    Prepara o corpo de um snippet para gravação.
+    Acima do limite (em bytes) o código é comprimido com zstd, se disponível,
+    ou zlib; só mantém a versão comprimida quando ela realmente for menor.
+    Retorna (encoding, payload, plain_size).
+    """
+    raw = code.encode("utf-8")
+    if threshold is None or len(raw) <= threshold:
+        return PLAIN, code, len(raw)
+
+    if zstandard is not None:
+        encoding, payload = ZSTD, zstandard.ZstdCompressor(level=9).compress(raw)
+    else:
+        encoding, payload = ZLIB, zlib.compress(raw, 9)
+
+    if len(payload) >= len(raw):
+        return PLAIN, code, len(raw)
+    return encoding, payload, len(raw)
+
+
+def decode_body(encoding, body):
+    """Devolve o código original a partir do que foi gravado por encode_body."""
+    if encoding == ZLIB:
+        return zlib.decompress(body).decode("utf-8")
+    if encoding == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Snippet comprimido com zstd, mas o pacote 'zstandard' não está instalado.")
+        return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    return body
@@ -1,223 +1,659 @@
 import sqlite3
 import os
+import re
+import json
+import threading
+import atexit
+from collections import namedtuple
+
+from core.cache import LRUCache
+from core.compression import encode_body, decode_body, content_hash, PLAIN
+from core.migrations import migrate
+
+# Registro de snippet usado pelas telas. Nas consultas de listagem (summaries)
+# o campo 'code' vem como None: o corpo só é carregado por Database.get_snippet.
+SnippetRecord = namedtuple(
+    "SnippetRecord",
+    ["id", "category_id", "title", "language", "code", "version", "is_custom", "category_name"]
+)
+
+# Colunas na ordem de SnippetRecord (com e sem o corpo do código).
+# As consultas usam LEFT JOIN em snippet_contents: quando o corpo não é pedido
+# o SQLite descarta o join e a tabela de conteúdos nem é lida.
+SNIPPET_COLUMNS = "s.id, s.category_id, s.title, s.language, codekit_decode(b.encoding, b.body), s.version, s.is_custom, c.name"
+SUMMARY_COLUMNS = "s.id, s.category_id, s.title, s.language, NULL, s.version, s.is_custom, c.name"
+SNIPPET_SOURCE = """
+    snippets s
+    JOIN categories c ON s.category_id = c.id
+    LEFT JOIN snippet_contents b ON b.id = s.content_id
+"""
+
+# Página de uma lista de ids (get_snippet_page_by_ids). 'next_cursor' é a posição do
+# próximo id, a ser passada como 'offset' na próxima chamada; None na última página.
+SnippetPage = namedtuple("SnippetPage", ["records", "next_cursor"])
+
+# Restringe uma consulta a uma lista de ids (JSON), ver search_snippet_ids
+WITHIN_IDS = "s.id IN (SELECT value FROM json_each(?))"
+
+# Ordem da busca global por relevância: custom primeiro, depois BM25 (pesos título > linguagem > código).
+# Sem FTS5 (busca por LIKE) não há ranking e a ordem é a de SEARCH_LIKE_ORDER.
+SEARCH_RANK_ORDER = "s.is_custom DESC, bm25(snippets_fts, 10.0, 5.0, 1.0), s.title ASC"
+SEARCH_LIKE_ORDER = "s.is_custom DESC, s.title ASC"
+
+# Resultado de uma sincronização em lote de snippets de sistema.
+# 'duplicates' conta os snippets gravados reaproveitando um corpo já armazenado.
+SyncResult = namedtuple("SyncResult", ["inserted", "updated", "unchanged", "duplicates"])
+
+# Tamanho do banco e dos corpos antes/depois da compressão
+StorageReport = namedtuple("StorageReport", ["bodies", "compressed", "plain_bytes", "stored_bytes", "file_bytes"])
+
+# Corpo armazenado uma única vez por hash (o ref_count é mantido por triggers).
+# 'encoding' marca o formato do corpo (plain/zlib/zstd), ver core.compression.
+STORE_CONTENT = '''
+    INSERT INTO snippet_contents (content_hash, encoding, body, plain_size) VALUES (?, ?, ?, ?)
+    ON CONFLICT (content_hash) DO NOTHING
+'''
+
+# Corpos já armazenados (entre os hashes dados) e os snippets de sistema que os usam
+STORED_CONTENT_OWNERS = '''
+    SELECT c.content_hash, s.category_id, s.title
+    FROM snippet_contents c
+    LEFT JOIN snippets s ON s.content_id = c.id AND s.is_custom = 0
+    WHERE c.content_hash IN (SELECT value FROM json_each(?))
+'''
+
+# Upsert de snippet de SISTEMA: atualiza só quando algo realmente mudou
+UPSERT_SYSTEM_SNIPPET = '''
+    INSERT INTO snippets (category_id, title, language, content_id, version, is_custom)
+    VALUES (?, ?, ?, (SELECT id FROM snippet_contents WHERE content_hash = ?), ?, 0)
+    ON CONFLICT (category_id, title) WHERE is_custom = 0 DO UPDATE SET
+        content_id = excluded.content_id, version = excluded.version, language = excluded.language
+    WHERE content_id IS NOT excluded.content_id
+       OR version IS NOT excluded.version
+       OR language IS NOT excluded.language
+'''
 
 class Database:
-    def __init__(self, db_name="codekit.db"):
+    # Ajustes de performance aplicados a cada conexão
+    BUSY_TIMEOUT = 5.0                  # segundos aguardando um lock de escrita
+    CACHE_SIZE_KB = 16384               # cache de páginas (16 MB)
+    MMAP_SIZE = 64 * 1024 * 1024        # leitura via memory-map (64 MB)
+    RESULT_CACHE_SIZE = 128             # consultas de listagem/busca mantidas em memória
+    PAGE_SIZE = 100                     # registros por página nas consultas paginadas
+    HIGHLIGHT_COMPRESS_THRESHOLD = 4096 # highlights salvos acima disso são comprimidos
+
+    def __init__(self, db_name="codekit.db", compress_threshold=None):
         self.db_name = db_name
-        self.init_db()
-        self._upgrade_db() 
+
+        # Uma conexão persistente por thread (sqlite3 não compartilha conexões entre threads)
+        self._local = threading.local()
+        self._connections = []
+        self._conn_lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+        # Esquema versionado (core.migrations): com o banco em dia, só lê PRAGMA user_version
+        migrate(self.get_connection())
+
+        # Calculados sob demanda, para não custar consultas na abertura do app
+        self._fts_enabled = None
+        self._categories = None     # cache nome -> (id, ícone), ver _category_cache
+        self._category_lock = threading.Lock()
+
+        # Resultados de listagens, contagens e buscas. Toda escrita incrementa a geração,
+        # que faz parte da chave: nada calculado antes de uma escrita é servido depois dela.
+        self._results = LRUCache(self.RESULT_CACHE_SIZE)
+        self._generation = 0
+        self._generation_lock = threading.Lock()    # escritas vêm da UI, do worker e da importação
+        self._compress_threshold = compress_threshold
+
+    @property
+    def fts_enabled(self):
+        """True se o índice FTS5 existe (o SQLite pode ter sido compilado sem FTS5)."""
+        if self._fts_enabled is None:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'snippets_fts'")
+                self._fts_enabled = cursor.fetchone() is not None
+        return self._fts_enabled
+
+    @property
+    def compress_threshold(self):
+        """Compressão de corpos grandes: o parâmetro do construtor tem prioridade sobre o valor salvo no banco."""
+        if self._compress_threshold is None:
+            saved = self.get_setting("compress_threshold")
+            self._compress_threshold = int(saved) if saved else False
+        return None if self._compress_threshold is False else self._compress_threshold
+
+    @compress_threshold.setter
+    def compress_threshold(self, value):
+        self._compress_threshold = value
 
     def get_connection(self):
-        """Retorna uma conexão e ativa suporte a chaves estrangeiras."""
-        conn = sqlite3.connect(self.db_name)
-        conn.execute("PRAGMA foreign_keys = ON")
+        """
+        Retorna a conexão persistente da thread atual, criando-a na primeira chamada.
+        Use com 'with' para delimitar transações; NÃO feche a conexão retornada.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Database já foi fechado.")
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._conn_lock:
+                self._connections.append(conn)
         return conn
 
-    def init_db(self):
-        """Cria as tabelas caso não existam."""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    icon TEXT
-                )
-            ''')
+    def close_thread_connection(self):
+        """
+        Fecha a conexão da thread atual, se houver. Para threads de vida curta
+        (ex.: a gravação de uma importação), que senão deixariam a conexão aberta até o close().
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._conn_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Erro ao fechar conexão: {e}")
 
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS snippets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    category_id INTEGER,
-                    title TEXT NOT NULL,
-                    language TEXT NOT NULL,
-                    code_content TEXT NOT NULL,
-                    version TEXT DEFAULT '',
-                    is_custom INTEGER DEFAULT 0,
-                    FOREIGN KEY (category_id) REFERENCES categories (id)
-                )
-            ''')
+    def _open_connection(self):
+        """Abre uma conexão com WAL, busy timeout e caches ajustados."""
+        conn = sqlite3.connect(self.db_name, timeout=self.BUSY_TIMEOUT, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.BUSY_TIMEOUT * 1000)}")
+        conn.execute(f"PRAGMA cache_size = -{self.CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {self.MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        # Usada pela view/triggers do FTS e pelas consultas para abrir corpos comprimidos
+        conn.create_function("codekit_decode", 2, decode_body, deterministic=True)
+        return conn
 
-            conn.commit()
-            self._seed_initial_data(cursor, conn)
+    def close(self):
+        """Fecha todas as conexões abertas (chamado ao sair do app)."""
+        with self._conn_lock:
+            if self._closed:
+                return
+            self._closed = True
+            connections, self._connections = self._connections, []
 
-    def _upgrade_db(self):
-        """Adiciona colunas novas sem apagar dados existentes."""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            try:
-                cursor.execute("ALTER TABLE snippets ADD COLUMN version TEXT DEFAULT ''")
-            except sqlite3.OperationalError: pass
-            
+        for conn in connections:
             try:
-                cursor.execute("ALTER TABLE snippets ADD COLUMN is_custom INTEGER DEFAULT 0")
-            except sqlite3.OperationalError: pass
-            
-            conn.commit()
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Erro ao fechar conexão: {e}")
+        atexit.unregister(self.close)
 
-    def _seed_initial_data(self, cursor, conn):
-        """Popula as categorias iniciais."""
-        cursor.execute("SELECT COUNT(*) FROM categories")
-        if cursor.fetchone()[0] == 0:
-            kits = [
-                ("Documentos", "📄"), ("Matemática", "🔢"), ("Strings", "🔤"),
-                ("Datas", "📅"), ("Arrays", "📊"), ("Arquivos", "📁"),
-                ("Redes", "🌐"), ("Segurança", "🔒"), ("Utilitários", "⚡"),
-                ("Algoritmos", "🧠"), ("Meus Snippets", "📂")
-            ]
-            for name, icon in kits:
-                cursor.execute("INSERT OR IGNORE INTO categories (name, icon) VALUES (?, ?)", (name, icon))
-            conn.commit()
+    def _category_cache(self):
+        """
+        Categorias em memória (nome -> (id, ícone)), lidas do banco uma única vez.
+        Chame com _category_lock: o cache é lido por várias threads (UI, worker,
+        importação). Só sync_system_snippets cria categorias, e as acrescenta aqui
+        depois do commit (ver _merge_categories).
+        """
+        if self._categories is None:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, name, icon FROM categories ORDER BY id")
+                self._categories = {name: (cat_id, icon) for cat_id, name, icon in cursor.fetchall()}
+        return self._categories
+
+    def _find_category(self, category_name):
+        """(id, ícone) da categoria, ou None se ela não existe."""
+        with self._category_lock:
+            return self._category_cache().get(category_name)
+
+    def _merge_categories(self, created):
+        """Acrescenta ao cache as categorias criadas por uma transação já confirmada."""
+        with self._category_lock:
+            if self._categories is not None:
+                self._categories.update(created)
+        created.clear()
 
     def get_categories(self):
+        with self._category_lock:
+            return [(cat_id, name, icon) for name, (cat_id, icon) in self._category_cache().items()]
+
+    def get_category_icon(self, category_name, default=None):
+        category = self._find_category(category_name)
+        return category[1] if category else default
+
+    def _cached(self, key, compute):
+        """Resultado de compute() guardado no cache de resultados da geração atual."""
+        generation = self._generation
+        result = self._results.get_or_compute((generation, *key), lambda: tuple(compute()))
+        return list(result)
+
+    def _bump_generation(self):
+        """Chamado após cada escrita (de qualquer thread): invalida todos os resultados em cache."""
+        with self._generation_lock:
+            self._generation += 1
+            self._results.clear()
+
+    def cache_stats(self):
+        """CacheStats(hits, misses, size, maxsize) do cache de resultados."""
+        return self._results.stats()
+
+    def get_snippets_by_category(self, category_name):
+        """Retorna os snippets completos (com código) de uma categoria."""
+        return self._cached(("category", category_name), lambda: self._query_category(SNIPPET_COLUMNS, category_name))
+
+    def get_snippet_summaries_by_category(self, category_name):
+        """Versão leve para listagens: mesmos registros, sem carregar o código."""
+        return self._cached(("category_summaries", category_name), lambda: self._query_category(SUMMARY_COLUMNS, category_name))
+
+    def get_snippet(self, snippet_id):
+        """Carrega um snippet completo (com código) pelo id, ou None."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT id, name, icon FROM categories")
-            return cursor.fetchall()
+            cursor.execute(f"""
+                SELECT {SNIPPET_COLUMNS}
+                FROM {SNIPPET_SOURCE}
+                WHERE s.id = ?
+            """, (snippet_id,))
+            row = cursor.fetchone()
+            return SnippetRecord._make(row) if row else None
 
-    def get_snippets_by_category(self, category_name):
-        """Retorna snippets com o nome da categoria incluído na posição [7]."""
+    def _query_category(self, columns, category_name):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             if category_name == "Meus Snippets":
-                query = """
-                    SELECT s.id, s.category_id, s.title, s.language, s.code_content, s.version, s.is_custom, c.name
-                    FROM snippets s
-                    JOIN categories c ON s.category_id = c.id
+                query = f"""
+                    SELECT {columns}
+                    FROM {SNIPPET_SOURCE}
                     WHERE s.is_custom = 1
                 """
                 cursor.execute(query)
             else:
-                query = """
-                    SELECT s.id, s.category_id, s.title, s.language, s.code_content, s.version, s.is_custom, c.name
-                    FROM snippets s
-                    JOIN categories c ON s.category_id = c.id
+                query = f"""
+                    SELECT {columns}
+                    FROM {SNIPPET_SOURCE}
                     WHERE c.name = ?
                 """
                 cursor.execute(query, (category_name,))
-            return cursor.fetchall()
+            return [SnippetRecord._make(row) for row in cursor.fetchall()]
 
     def add_custom_snippet(self, category_name, title, language, code, version=""):
         """Adiciona snippet do USUÁRIO (is_custom = 1)."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT id FROM categories WHERE name = ?", (category_name,))
-            res = cursor.fetchone()
-            
-            if not res or category_name == "Meus Snippets":
-                cat_id = self._get_meus_snippets_id(cursor)
-            else:
-                cat_id = res[0]
-            
+            cat_id = self._user_category_id(category_name)
+            content_id = self._store_content(cursor, code)
             cursor.execute('''
-                INSERT INTO snippets (category_id, title, language, code_content, version, is_custom)
+                INSERT INTO snippets (category_id, title, language, content_id, version, is_custom)
                 VALUES (?, ?, ?, ?, ?, 1)
-            ''', (cat_id, title, language, code, version))
+            ''', (cat_id, title, language, content_id, version))
             conn.commit()
+        self._bump_generation()
 
     def add_default_snippet(self, category_name, title, language, code, version=""):
-        """MÉTODO PARA O SEEDER: Adiciona snippet de SISTEMA (is_custom = 0)."""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id FROM categories WHERE name = ?", (category_name,))
-            res = cursor.fetchone()
-            
-            if res:
-                cat_id = res[0]
-            else:
-                cursor.execute("INSERT INTO categories (name, icon) VALUES (?, ?)", (category_name, "📁"))
-                cat_id = cursor.lastrowid
-            
-            cursor.execute('''
-                INSERT INTO snippets (category_id, title, language, code_content, version, is_custom)
-                VALUES (?, ?, ?, ?, ?, 0)
-            ''', (cat_id, title, language, code, version))
-            conn.commit()
+        """
+        MÉTODO PARA O SEEDER: Adiciona snippet de SISTEMA (is_custom = 0).
+        Se já existir um PADRÃO com o mesmo título na categoria, ele é atualizado.
+        """
+        self.sync_system_snippets([(category_name, title, language, code, version)])
 
     def update_system_snippets(self, category_name, title, language, code, version=""):
         """
         Lógica para Sincronização de Kits (GitHub/Pasta).
         Atualiza snippets padrão existentes ou cria novos sem mexer nos 'Custom'.
         """
+        self.sync_system_snippets([(category_name, title, language, code, version)])
+
+    def sync_system_snippets(self, snippets, chunk_size=None):
+        """
+        Sincronização em lote: recebe um iterável de tuplas
+        (category_name, title, language, code, version) e grava tudo com upsert.
+        Por padrão usa uma única transação; com chunk_size faz um commit a cada bloco.
+        Retorna um SyncResult com as contagens de inseridos/atualizados/inalterados
+        e de corpos duplicados (gravados com um corpo já armazenado ou repetido no lote).
+        """
+        inserted = updated = unchanged = duplicates = 0
+
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            # 1. Busca ou cria a categoria
-            cursor.execute("SELECT id FROM categories WHERE name = ?", (category_name,))
-            res = cursor.fetchone()
-            if res:
-                cat_id = res[0]
-            else:
-                cursor.execute("INSERT INTO categories (name, icon) VALUES (?, ?)", (category_name, "📁"))
-                cat_id = cursor.lastrowid
+            chunk = []
+            owners = {}     # hash do corpo -> {(category_id, title)} que já o usam
+            created = {}    # categorias criadas ainda não confirmadas (fora do cache)
 
-            # 2. Tenta atualizar se já existir um snippet de SISTEMA (is_custom=0) com esse título
-            cursor.execute('''
-                UPDATE snippets 
-                SET code_content = ?, version = ?, language = ?
-                WHERE category_id = ? AND title = ? AND is_custom = 0
-            ''', (code, version, language, cat_id, title))
-
-            # 3. Se não existia nenhum PADRÃO com esse nome, insere como novo de sistema
-            if cursor.rowcount == 0:
-                cursor.execute('''
-                    INSERT INTO snippets (category_id, title, language, code_content, version, is_custom)
-                    VALUES (?, ?, ?, ?, ?, 0)
-                ''', (cat_id, title, language, code, version))
-            
-            conn.commit()
+            def flush():
+                nonlocal inserted, updated, unchanged, duplicates
+                # Snippets de sistema que já apontam para cada corpo do bloco já armazenado
+                # (lido antes de gravar; corpos que ainda não existem não aparecem aqui)
+                hashes = list({row[3] for row, _ in chunk})
+                cursor.execute(STORED_CONTENT_OWNERS, (json.dumps(hashes),))
+                for digest, cat_id, title in cursor.fetchall():
+                    owners.setdefault(digest, set())
+                    if cat_id is not None:
+                        owners[digest].add((cat_id, title))
+
+                # Corpos novos entram em snippet_contents; os já conhecidos são ignorados
+                cursor.executemany(STORE_CONTENT, [(row[3], *encode_body(body, self.compress_threshold)) for row, body in chunk])
+
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM snippets")
+                last_id = cursor.fetchone()[0]
+
+                cursor.executemany(UPSERT_SYSTEM_SNIPPET, [row for row, _ in chunk])
+                changed = cursor.rowcount
+
+                # AUTOINCREMENT garante ids crescentes: tudo acima de last_id é novo
+                cursor.execute("SELECT COUNT(*) FROM snippets WHERE id > ?", (last_id,))
+                new_rows = cursor.fetchone()[0]
+
+                inserted += new_rows
+                updated += changed - new_rows
+                unchanged += len(chunk) - changed
+                # Duplicado: snippet inserido ou com corpo trocado (só versão/linguagem não conta)
+                # cujo corpo já existia no banco ou apareceu antes neste lote
+                for (cat_id, title, _, digest, _), _ in chunk:
+                    known = owners.get(digest)
+                    if known is None:
+                        owners[digest] = {(cat_id, title)}
+                    elif (cat_id, title) not in known:
+                        duplicates += 1
+                        known.add((cat_id, title))
+                chunk.clear()
+                self._release_orphan_contents(cursor)
+                if chunk_size:
+                    conn.commit()
+                    self._merge_categories(created)
+                    self._bump_generation()
 
-    def _get_meus_snippets_id(self, cursor):
-        cursor.execute("SELECT id FROM categories WHERE name = 'Meus Snippets'")
-        res = cursor.fetchone()
-        return res[0] if res else 1
+            try:
+                for category_name, title, language, code, version in snippets:
+                    cat_id = self._get_or_create_category(cursor, category_name, created)
+                    chunk.append(((cat_id, title, language, content_hash(code), version), code))
+                    if chunk_size and len(chunk) >= chunk_size:
+                        flush()
+
+                if chunk:
+                    flush()
+                conn.commit()
+                self._merge_categories(created)
+            finally:
+                # Num erro, as categorias de 'created' foram desfeitas e nunca entram no cache
+                self._bump_generation()
+
+        return SyncResult(inserted, updated, unchanged, duplicates)
+
+    def _get_or_create_category(self, cursor, category_name, created):
+        """Id da categoria; as criadas agora ficam em 'created' até o commit."""
+        category = self._find_category(category_name) or created.get(category_name)
+        if category:
+            return category[0]
+        cursor.execute("INSERT INTO categories (name, icon) VALUES (?, ?)", (category_name, "📁"))
+        created[category_name] = (cursor.lastrowid, "📁")
+        return cursor.lastrowid
+
+    def _store_content(self, cursor, code):
+        """Grava o corpo no armazenamento por hash (se ainda não existir) e retorna seu id."""
+        digest = content_hash(code)
+        cursor.execute(STORE_CONTENT, (digest, *encode_body(code, self.compress_threshold)))
+        if cursor.rowcount:
+            return cursor.lastrowid
+        cursor.execute("SELECT id FROM snippet_contents WHERE content_hash = ?", (digest,))
+        return cursor.fetchone()[0]
+
+    def _release_orphan_contents(self, cursor):
+        """Remove corpos que não são mais referenciados por nenhum snippet (e o highlight deles)."""
+        cursor.execute('''
+            DELETE FROM highlight_cache WHERE content_hash IN (
+                SELECT content_hash FROM snippet_contents WHERE ref_count <= 0
+            )
+        ''')
+        cursor.execute("DELETE FROM snippet_contents WHERE ref_count <= 0")
+
+    def _get_meus_snippets_id(self):
+        category = self._find_category("Meus Snippets")
+        return category[0] if category else 1
+
+    def _user_category_id(self, category_name):
+        """Categoria de um snippet do usuário: categorias desconhecidas caem em 'Meus Snippets'."""
+        category = self._find_category(category_name)
+        if not category or category_name == "Meus Snippets":
+            return self._get_meus_snippets_id()
+        return category[0]
 
     def update_snippet(self, snippet_id, category_name, title, language, code, version):
         """Atualiza o snippet, permitindo inclusive trocar a categoria (Pasta)."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute("SELECT id FROM categories WHERE name = ?", (category_name,))
-            res = cursor.fetchone()
-            
-            if not res or category_name == "Meus Snippets":
-                cat_id = self._get_meus_snippets_id(cursor)
-            else:
-                cat_id = res[0]
-
+            cat_id = self._user_category_id(category_name)
+            content_id = self._store_content(cursor, code)
             cursor.execute('''
                 UPDATE snippets 
-                SET category_id = ?, title = ?, language = ?, code_content = ?, version = ?
+                SET category_id = ?, title = ?, language = ?, content_id = ?, version = ?
                 WHERE id = ?
-            ''', (cat_id, title, language, code, version, snippet_id))
+            ''', (cat_id, title, language, content_id, version, snippet_id))
+            self._release_orphan_contents(cursor)
             conn.commit()
+        self._bump_generation()
 
     def delete_snippet(self, snippet_id):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM snippets WHERE id = ?", (snippet_id,))
+            self._release_orphan_contents(cursor)
             conn.commit()
+        self._bump_generation()
     
     def search_all_snippets(self, query):
-        """Busca global em todos os snippets cadastrados."""
+        """
+        Busca global em todos os snippets cadastrados.
+        Usa o índice FTS5 (prefixos + ranking BM25); LIKE apenas como fallback.
+        """
+        return self._cached(("search", query), lambda: [SnippetRecord._make(row) for row in self._search(SNIPPET_COLUMNS, query)])
+
+    @staticmethod
+    def _build_match_query(query):
+        """
+        Converte o texto digitado numa expressão MATCH: cada termo vira uma
+        busca por prefixo ("term"*) e todos precisam aparecer (AND implícito).
+        Retorna None quando não há termos pesquisáveis (ex: apenas símbolos).
+        """
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return None
+        return " ".join(f'"{term}"*' for term in terms)
+
+    # --- Busca da lista de resultados ---
+
+    def search_snippet_ids(self, query, within=None):
+        """
+        Ids de todos os snippets encontrados pela busca global, na mesma ordem de
+        search_all_snippets (ranking BM25). Só os ids: as páginas são carregadas
+        depois com get_snippet_page_by_ids, fatiando esta lista.
+        Com 'within' (ids de uma busca anterior) só esses snippets são examinados,
+        o que vale quando a nova busca apenas estreita a anterior (ver narrows_search).
+        """
+        return [row[0] for row in self._search("s.id", query, within)]
+
+    def get_snippet_page_by_ids(self, ids, offset=0, limit=None, summaries=True):
+        """
+        Uma página de uma lista de ids já ordenada (ex: search_snippet_ids), como SnippetPage.
+        Só os ids da página vão ao banco; 'next_cursor' é o 'offset' da próxima.
+        Ids que não existem mais (snippet apagado) são pulados.
+        """
+        limit = limit or self.PAGE_SIZE
+        page_ids = ids[offset:offset + limit]
+        next_cursor = offset + limit if offset + limit < len(ids) else None
+        if not page_ids:
+            return SnippetPage([], next_cursor)
+
+        columns = SUMMARY_COLUMNS if summaries else SNIPPET_COLUMNS
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            search_query = f"%{query}%"
-            sql = """
-                SELECT s.id, s.category_id, s.title, s.language, s.code_content, s.version, s.is_custom, c.name
-                FROM snippets s
+            cursor.execute(f"SELECT {columns} FROM {SNIPPET_SOURCE} WHERE {WITHIN_IDS}", (json.dumps(page_ids),))
+            found = {row[0]: SnippetRecord._make(row) for row in cursor.fetchall()}
+        return SnippetPage([found[i] for i in page_ids if i in found], next_cursor)
+
+    def narrows_search(self, previous_query, query):
+        """
+        True se todo resultado de 'query' também é resultado de 'previous_query'
+        (o texto só ganhou caracteres no fim, ex: "dat" -> "date").
+        Não vale quando a busca anterior caiu no LIKE e a nova usa o FTS.
+        """
+        if not query.startswith(previous_query):
+            return False
+        if not self.fts_enabled:
+            return True
+        return (self._build_match_query(previous_query) is None) == (self._build_match_query(query) is None)
+
+    def _search(self, columns, query, within=None):
+        """
+        Linhas (só 'columns') da busca global, na ordem de relevância. Única consulta usada
+        por search_all_snippets e search_snippet_ids, para que ranking e prefixos sejam os mesmos.
+        """
+        source, condition, params, order = self._search_condition(query)
+        if within is not None:
+            condition = f"{condition} AND {WITHIN_IDS}"
+            params = (*params, json.dumps(list(within)))
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {columns} FROM {source} WHERE {condition} ORDER BY {order}", params)
+            return cursor.fetchall()
+
+    def _search_condition(self, query):
+        """
+        (origem, condição, parâmetros, ordem por relevância) da busca global: FTS5 ou,
+        sem termos/FTS5, busca por substring com LIKE (varredura completa).
+        """
+        match_query = self._build_match_query(query)
+        if self.fts_enabled and match_query is not None:
+            source = """
+                snippets_fts f
+                JOIN snippets s ON s.id = f.rowid
                 JOIN categories c ON s.category_id = c.id
-                WHERE s.title LIKE ? OR s.code_content LIKE ? OR s.language LIKE ?
-                ORDER BY s.is_custom DESC, s.title ASC
+                LEFT JOIN snippet_contents b ON b.id = s.content_id
             """
-            cursor.execute(sql, (search_query, search_query, search_query))
-            return cursor.fetchall()
+            return source, "snippets_fts MATCH ?", (match_query,), SEARCH_RANK_ORDER
+
+        search_query = f"%{query}%"
+        condition = "(s.title LIKE ? OR codekit_decode(b.encoding, b.body) LIKE ? OR s.language LIKE ?)"
+        return SNIPPET_SOURCE, condition, (search_query,) * 3, SEARCH_LIKE_ORDER
 
     def get_total_snippets_count(self):
         """Retorna a contagem total de todos os snippets armazenados no banco."""
+        return self._cached(("count",), self._count_snippets)[0]
+
+    def _count_snippets(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM snippets")
             result = cursor.fetchone()
-            return result[0] if result else 0
\ No newline at end of file
+            return [result[0] if result else 0]
+
+    def get_sync_manifest(self, folder_path):
+        """
+        Retorna {source_path: (mtime_ns, size, content_hash)} dos arquivos
+        já sincronizados a partir da pasta informada.
+        """
+        prefix = os.path.join(os.path.abspath(folder_path), "")
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT source_path, mtime_ns, size, content_hash FROM sync_manifest
+                WHERE substr(source_path, 1, ?) = ?
+            ''', (len(prefix), prefix))
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    def update_sync_manifest(self, entries):
+        """Grava entradas (source_path, mtime_ns, size, content_hash) do manifesto."""
+        with self.get_connection() as conn:
+            conn.executemany('''
+                INSERT INTO sync_manifest (source_path, mtime_ns, size, content_hash)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (source_path) DO UPDATE SET
+                    mtime_ns = excluded.mtime_ns, size = excluded.size, content_hash = excluded.content_hash
+            ''', entries)
+            conn.commit()
+
+    def remove_sync_manifest(self, source_paths):
+        """Esquece arquivos que não existem mais na pasta de origem."""
+        with self.get_connection() as conn:
+            conn.executemany("DELETE FROM sync_manifest WHERE source_path = ?", [(p,) for p in source_paths])
+            conn.commit()
+
+    def get_highlight_spans(self, content_hash, language, version):
+        """Intervalos de highlight salvos por save_highlight_spans, ou None."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT encoding, spans FROM highlight_cache
+                WHERE content_hash = ? AND language = ? AND version = ?
+            ''', (content_hash, language, version))
+            row = cursor.fetchone()
+        return json.loads(decode_body(*row)) if row else None
+
+    def save_highlight_spans(self, content_hash, language, version, spans):
+        """Guarda os intervalos de highlight ({tag: [início, fim, ...]}) de um código."""
+        encoding, payload, _ = encode_body(json.dumps(spans, separators=(",", ":")), self.HIGHLIGHT_COMPRESS_THRESHOLD)
+        with self.get_connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO highlight_cache (content_hash, language, version, encoding, spans)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (content_hash, language, version, encoding, payload))
+            conn.commit()
+
+    def get_setting(self, key, default=None):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+            res = cursor.fetchone()
+            return res[0] if res else default
+
+    def set_setting(self, key, value):
+        with self.get_connection() as conn:
+            conn.execute('''
+                INSERT INTO settings (key, value) VALUES (?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value
+            ''', (key, None if value is None else str(value)))
+            conn.commit()
+
+    def storage_report(self):
+        """Resumo do espaço ocupado pelos corpos dos snippets e pelo arquivo do banco."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT COUNT(*), COALESCE(SUM(encoding != 'plain'), 0),
+                       COALESCE(SUM(plain_size), 0), COALESCE(SUM(length(CAST(body AS BLOB))), 0)
+                FROM snippet_contents
+            ''')
+            bodies, compressed, plain_bytes, stored_bytes = cursor.fetchone()
+            page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+            page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+            return StorageReport(bodies, compressed, plain_bytes, stored_bytes, page_count * page_size)
+
+    def compress_existing_bodies(self, threshold):
+        """
+        Migração única para o modo comprimido: grava o limite nas configurações,
+        comprime os corpos já existentes acima dele e compacta o arquivo (VACUUM).
+        Retorna (antes, depois) como StorageReport.
+        """
+        before = self.storage_report()
+        self.compress_threshold = threshold
+        self.set_setting("compress_threshold", threshold)
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, body FROM snippet_contents WHERE encoding = 'plain' AND plain_size > ?",
+                (threshold,)
+            )
+            updates = []
+            for content_id, body in cursor.fetchall():
+                encoding, payload, _ = encode_body(body, threshold)
+                if encoding != PLAIN:
+                    updates.append((encoding, payload, content_id))
+            cursor.executemany("UPDATE snippet_contents SET encoding = ?, body = ? WHERE id = ?", updates)
+            conn.commit()
+            conn.execute("VACUUM")
+
+        return before, self.storage_report()
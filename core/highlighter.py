@@ -1,8 +1,44 @@
+import sqlite3
+import time
+import tkinter as tk
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import takewhile
+
 from pygments import lexers, highlight
 from pygments.lexers import get_lexer_by_name
+from pygments.token import string_to_tokentype
+from pygments.util import ClassNotFound
+
+from core.cache import LRUCache
+from core.compression import content_hash
+from core.line_states import LineLexer
+
+# Versão do cálculo de intervalos: mude ao alterar compute_tag_ranges ou o lexer usado,
+# para que os highlights já salvos no banco sejam ignorados
+HIGHLIGHTER_VERSION = 1
+
+# Uso do cache de highlight: acertos na memória, no banco e cálculos com o Pygments
+HighlightStats = namedtuple("HighlightStats", ["memory_hits", "store_hits", "misses"])
+
 
 class SyntaxHighlighter:
-    def __init__(self):
+    """
+    Aplica o highlight do Pygments num Text/CTkTextbox.
+    Os intervalos calculados ficam num cache por (hash do código, linguagem, versão):
+    um LRU em memória e, se 'store' for informado (Database), a tabela highlight_cache,
+    que sobrevive entre execuções. cache_size=0 desliga o cache (ex: editor, onde o
+    texto muda a cada tecla).
+    """
+
+    def __init__(self, store=None, cache_size=64):
+        self.store = store
+        self.memory = LRUCache(cache_size) if cache_size else None
+        self.store_hits = 0
+        self.misses = 0
+        self.closed = False
+        self._executor = None # Thread de highlight (HighlightJob), criada no primeiro uso
+
         # Cores estilo "One Dark" ou "Monokai"
         self.token_colors = {
             'Token.Keyword': '#C678DD',
@@ -12,36 +48,514 @@ class SyntaxHighlighter:
             'Token.Operator': '#56B6C2',
             'Token.Name.Class': '#E5C07B',
         }
+        self.default_color = "#ABB2BF"
+
+        # Memos por objeto de token (os tipos do Pygments são singletons)
+        self._base_colors = {string_to_tokentype(name): color for name, color in self.token_colors.items()}
+        self._colors = {}       # token -> cor
+        self._tag_names = {}    # token -> nome da tag ("Token.Keyword")
+        self._tag_tokens = {}   # nome da tag -> token (tags vindas do cache não passam pelo lexer)
+        self._lexers = {}       # nome da linguagem -> instância do lexer
 
     def apply_highlight(self, text_widget, code, lang_name):
         try:
+            # CTkTextbox.tag_add só aceita um intervalo; o Text do Tk aceita vários por chamada
+            textbox = getattr(text_widget, "_textbox", text_widget)
+
             # Remove tags antigas sem deletar o texto
-            for tag in text_widget.tag_names():
-                text_widget.tag_delete(tag)
+            for tag in textbox.tag_names():
+                textbox.tag_delete(tag)
+
+            # Processa o conteúdo e aplica as tags por cima do texto existente
+            content = textbox.get("1.0", "end-1c")
+            ranges = self.get_tag_ranges(content, lang_name)
+
+            # Uma configuração e um tag_add por tipo de token, com todos os intervalos dele
+            for token_type, indices in ranges.items():
+                textbox.tag_config(token_type, foreground=self._get_color_for_tag(token_type))
+                textbox.tag_add(token_type, *indices)
+        except Exception as e:
+            print(f"Erro no highlight: {e}")
+
+    def apply_highlight_progressive(self, text_widget, code, lang_name, **kwargs):
+        """Como apply_highlight, mas em etapas (ver HighlightJob). Retorna o job iniciado."""
+        return HighlightJob(self, text_widget, code, lang_name, **kwargs).start()
+
+    def get_tag_ranges(self, content, lang_name):
+        """Intervalos de compute_tag_ranges, vindos do cache quando possível."""
+        ranges = self.cached_tag_ranges(content, lang_name)
+        if ranges is None:
+            ranges = self.compute_tag_ranges(self._get_lexer(lang_name), content)
+            self.remember_tag_ranges(content, lang_name, ranges)
+        return ranges
+
+    def cached_tag_ranges(self, content, lang_name):
+        """Intervalos já calculados para este texto (memória ou banco), ou None."""
+        if self.memory is None:
+            return None
 
+        key = self._cache_key(content, lang_name)
+        ranges = self.memory.get(key)
+        if ranges is not None:
+            return ranges
+
+        ranges = self._load_from_store(key)
+        if ranges is not None:
+            self.store_hits += 1
+            self.memory.put(key, ranges)
+        else:
+            self.misses += 1
+        return ranges
+
+    def remember_tag_ranges(self, content, lang_name, ranges):
+        """Guarda intervalos recém-calculados nos níveis do cache."""
+        if self.memory is None:
+            return
+        key = self._cache_key(content, lang_name)
+        self._save_to_store(key, ranges)
+        self.memory.put(key, ranges)
+
+    def _cache_key(self, content, lang_name):
+        return (content_hash(content), lang_name.lower(), HIGHLIGHTER_VERSION)
+
+    def _load_from_store(self, key):
+        if self.store is None:
+            return None
+        try:
+            return self.store.get_highlight_spans(*key)
+        except sqlite3.Error as e:
+            print(f"Erro ao ler o cache de highlight: {e}")
+            return None
+
+    def _save_to_store(self, key, ranges):
+        if self.store is None:
+            return
+        try:
+            self.store.save_highlight_spans(*key, ranges)
+        except sqlite3.Error as e:
+            print(f"Erro ao salvar o cache de highlight: {e}")
+
+    def _worker(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="codekit-highlight")
+        return self._executor
+
+    def shutdown(self):
+        """Interrompe os HighlightJob em andamento e encerra a thread de highlight."""
+        self.closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def cache_stats(self):
+        """HighlightStats com os acertos de cada nível do cache."""
+        memory_hits = self.memory.hits if self.memory else 0
+        return HighlightStats(memory_hits, self.store_hits, self.misses)
+
+    def _get_lexer(self, lang_name):
+        """Lexer da linguagem, criado uma vez por nome; nomes desconhecidos usam o de texto puro."""
+        key = (lang_name or "text").lower()
+        lexer = self._lexers.get(key)
+        if lexer is None:
             try:
-                lexer = get_lexer_by_name(lang_name)
-            except:
-                lexer = get_lexer_by_name('text')
+                lexer = get_lexer_by_name(key)
+            except ClassNotFound:
+                lexer = self._get_lexer("text") if key != "text" else get_lexer_by_name("text")
+            self._lexers[key] = lexer
+        return lexer
 
-            # Processa o conteúdo e aplica as tags por cima do texto existente
-            content = text_widget.get("1.0", "end-1c")
-            start_index = "1.0"
-            
-            for token, value in lexer.get_tokens(content):
-                end_index = text_widget.index(f"{start_index} + {len(value)} chars")
-                token_type = str(token)
-                
-                color = self._get_color_for_token(token_type)
-                if color:
-                    text_widget.tag_config(token_type, foreground=color)
-                    text_widget.tag_add(token_type, start_index, end_index)
-                
-                start_index = end_index
-        except:
-            pass
-
-    def _get_color_for_token(self, token_type):
-        for key, color in self.token_colors.items():
-            if key in token_type: return color
-        return "#ABB2BF"
\ No newline at end of file
+    def compute_tag_ranges(self, lexer, content):
+        """
+        Converte os tokens do Pygments em {tipo do token: [início, fim, início, fim, ...]}
+        com índices "linha.coluna" do Tk, calculados em Python (sem consultar o widget).
+        Trechos só de espaço são pulados (a cor não aparece neles), e tokens seguidos do
+        mesmo tipo viram um único intervalo.
+        """
+        # get_tokens_unprocessed preserva o texto exato (get_tokens remove/adiciona
+        # quebras de linha nas pontas, o que deslocaria os índices)
+        return self._ranges_from_tokens(lexer.get_tokens_unprocessed(content))
+
+    def _ranges_from_tokens(self, tokens, line=1):
+        """compute_tag_ranges para um fluxo de tokens que começa no início da linha 'line'."""
+        ranges = {}
+        previous_type = None
+        col = 0
+        tag_names = self._tag_names
+
+        for _, token, value in tokens:
+            start = f"{line}.{col}"
+            newlines = value.count("\n")
+            if newlines:
+                line += newlines
+                col = len(value) - value.rfind("\n") - 1
+            else:
+                col += len(value)
+
+            if not value or value.isspace():
+                continue
+            end = f"{line}.{col}"
+            token_type = tag_names.get(token) or self._tag_name(token)
+
+            indices = ranges.setdefault(token_type, [])
+            if token_type == previous_type:
+                indices[-1] = end
+            else:
+                indices.append(start)
+                indices.append(end)
+            previous_type = token_type
+
+        return ranges
+
+    def _tag_name(self, token):
+        """Nome da tag de um tipo de token, guardado nos memos nos dois sentidos."""
+        token_type = self._tag_names[token] = str(token)
+        self._tag_tokens[token_type] = token
+        return token_type
+
+    def _get_color_for_token(self, token):
+        """Cor de um tipo de token do Pygments (memo pelo próprio objeto, sem montar strings)."""
+        color = self._colors.get(token)
+        if color is None:
+            color = self._colors[token] = self._resolve_color(token)
+        return color
+
+    def _get_color_for_tag(self, tag_name):
+        """Cor de uma tag de token ("Token.Keyword"), como as chaves de get_tag_ranges."""
+        token = self._tag_tokens.get(tag_name)
+        if token is None:
+            token = self._tag_tokens[tag_name] = string_to_tokentype(tag_name)
+        return self._get_color_for_token(token)
+
+    def _resolve_color(self, token):
+        # Sobe na hierarquia (Token.Keyword.Constant -> Token.Keyword -> Token) até achar uma cor
+        while token is not None:
+            if token in self._base_colors:
+                return self._base_colors[token]
+            token = token.parent
+        return self.default_color
+
+
+class HighlightJob:
+    """
+    Highlight de um texto grande sem travar a tela:
+    1. as linhas visíveis são destacadas na hora (o lexer roda só até o fim delas);
+    2. o texto inteiro passa pelo lexer na thread de highlight (usando o cache do
+       SyntaxHighlighter, que também guarda o resultado);
+    3. as tags são aplicadas em fatias via after(), no máximo 'budget_ms' por fatia.
+    cancel() interrompe o que faltar (ex: ao abrir outro snippet).
+    Com text_complete=False (texto ainda sendo inserido em partes), as tags do passo 3
+    esperam até alguém marcar job.text_complete = True.
+    """
+
+    RANGES_PER_CALL = 1000 # Intervalos por tag_add dentro de uma fatia
+
+    def __init__(self, highlighter, text_widget, code, lang_name, budget_ms=8, interval=15,
+                 text_complete=True):
+        self.highlighter = highlighter
+        self.textbox = getattr(text_widget, "_textbox", text_widget)
+        self.code = code
+        self.lang_name = lang_name
+        self.budget = budget_ms / 1000
+        self.interval = interval
+        self.text_complete = text_complete
+        self.cancelled = False
+
+        self._future = None
+        self._pending = []  # (tipo do token, índices) ainda não aplicados
+        self._configured = set()
+
+    def start(self):
+        try:
+            for tag in self.textbox.tag_names():
+                self.textbox.tag_delete(tag)
+            self._apply(self._viewport_ranges())
+        except tk.TclError:
+            self.cancel()
+            return self
+
+        self._future = self.highlighter._worker().submit(self._compute)
+        self.textbox.after(self.interval, self._poll)
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+        if self._future is not None:
+            self._future.cancel()
+        self._pending = []
+
+    def _viewport_ranges(self):
+        # Última linha visível (com folga, caso o widget ainda não tenha sido desenhado)
+        last_line = int(self.textbox.index(f"@0,{self.textbox.winfo_height()}").split(".")[0])
+        limit = 0
+        for _ in range(max(last_line, 60)):
+            limit = self.code.find("\n", limit) + 1
+            if not limit:
+                limit = len(self.code)
+                break
+
+        lexer = self.highlighter._get_lexer(self.lang_name)
+        tokens = takewhile(lambda token: token[0] < limit, lexer.get_tokens_unprocessed(self.code))
+        return self.highlighter._ranges_from_tokens(tokens)
+
+    def _compute(self):
+        """Roda na thread de highlight."""
+        highlighter = self.highlighter
+        ranges = highlighter.cached_tag_ranges(self.code, self.lang_name)
+        if ranges is None:
+            lexer = highlighter._get_lexer(self.lang_name)
+            ranges = highlighter._ranges_from_tokens(self._tokens(lexer))
+            if self._stopped():
+                return None
+            highlighter.remember_tag_ranges(self.code, self.lang_name, ranges)
+        return ranges
+
+    def _tokens(self, lexer):
+        for token in lexer.get_tokens_unprocessed(self.code):
+            if self._stopped():
+                return
+            yield token
+
+    def _stopped(self):
+        return self.cancelled or self.highlighter.closed
+
+    def _poll(self):
+        if self.cancelled:
+            return
+        if not self._future.done() or not self.text_complete:
+            self.textbox.after(self.interval, self._poll)
+            return
+        if self._future.cancelled() or self._future.exception() is not None:
+            if not self._future.cancelled():
+                print(f"Erro no highlight: {self._future.exception()}")
+            return
+
+        ranges = self._future.result()
+        if ranges is None:
+            return
+        step = self.RANGES_PER_CALL * 2
+        self._pending = [
+            (token_type, indices[i:i + step])
+            for token_type, indices in ranges.items()
+            for i in range(0, len(indices), step)
+        ]
+        self._pending.reverse() # pop() do fim mantém a ordem original
+        self._apply_slice()
+
+    def _apply_slice(self):
+        if self.cancelled:
+            return
+        deadline = time.perf_counter() + self.budget
+        try:
+            while self._pending and time.perf_counter() < deadline:
+                token_type, indices = self._pending.pop()
+                self._apply({token_type: indices})
+        except tk.TclError:
+            self.cancel() # Widget destruído
+            return
+        if self._pending:
+            self.textbox.after(self.interval, self._apply_slice)
+
+    def _apply(self, ranges):
+        for token_type, indices in ranges.items():
+            if token_type not in self._configured:
+                self.textbox.tag_config(token_type, foreground=self.highlighter._get_color_for_tag(token_type))
+                self._configured.add(token_type)
+            self.textbox.tag_add(token_type, *indices)
+
+
+def _common_prefix(a, b):
+    """Quantos caracteres iniciais 'a' e 'b' têm em comum."""
+    size = min(len(a), len(b))
+    for i in range(size):
+        if a[i] != b[i]:
+            return i
+    return size
+
+
+class IncrementalHighlighter:
+    """
+    Highlight de um editor que muda a cada tecla, sempre igual ao de apply_highlight.
+    Guarda, por linha, a pilha do lexer no início dela, os intervalos das tags e as
+    regras de várias linhas tentadas nela (ver LineLexer). Numa edição:
+    1. recomeça na linha anterior à mudança, ou antes, se alguma regra de várias linhas
+       tentada mais acima dá outro resultado no texto novo (ex: abrir um '/*' que agora
+       fecha lá embaixo);
+    2. refaz o lexer dali até a pilha coincidir de novo com a de antes, já no texto que
+       não mudou;
+    3. troca as tags só das linhas editadas e das que mudaram de intervalos.
+    Lexers que não dão para retomar (ver resume_mode) passam inteiros pelo passo 2.
+    """
+
+    def __init__(self, highlighter, text_widget):
+        self.highlighter = highlighter
+        self.textbox = getattr(text_widget, "_textbox", text_widget)
+        self.lang_name = None
+        self.lexer = None
+        self.content = None     # texto destacado por último (None = refazer tudo)
+        self.lines = []
+        self.states = []        # pilha do lexer no início de cada linha (None = meio de token)
+        self.probes = []        # regras de várias linhas tentadas em cada linha (ver LineLexer.scan)
+        self.ranges = []        # intervalos (tag, coluna inicial, coluna final) de cada linha
+        self.tag_types = set()  # tags de token já configuradas no widget
+
+    def set_language(self, lang_name):
+        if lang_name != self.lang_name:
+            self.lang_name = lang_name
+            self.lexer = LineLexer(self.highlighter._get_lexer(lang_name))
+            self.reset()
+
+    def reset(self):
+        """Faz o próximo update refazer o texto inteiro."""
+        self.content = None
+
+    def update(self):
+        """Atualiza as tags para o texto atual do widget."""
+        try:
+            self._update(self.textbox.get("1.0", "end-1c"))
+        except Exception as e:
+            print(f"Erro no highlight incremental: {e}")
+            self.reset()
+
+    def _update(self, content):
+        if content == self.content:
+            return
+        lines = content.split("\n")
+        old_lines = self.lines
+        if self.content is None:
+            old_lines = self.lines = self.states = self.probes = self.ranges = []
+            # Refazendo tudo: tira as tags de token anteriores, inclusive as de outra
+            # linguagem aplicadas pelo apply_highlight (que não passam por tag_types)
+            for tag in self.textbox.tag_names():
+                if tag.startswith("Token"):
+                    self.textbox.tag_delete(tag)
+            self.tag_types.clear()
+
+        # Trecho alterado: linhas iguais no começo e no fim ficam de fora
+        limit = min(len(lines), len(old_lines))
+        first = 0
+        while first < limit and lines[first] == old_lines[first]:
+            first += 1
+        same_tail = 0
+        while same_tail < limit and lines[-1 - same_tail] == old_lines[-1 - same_tail]:
+            same_tail += 1
+        delta = len(lines) - len(old_lines)
+        # Da linha shifted_from em diante o texto é o da linha - delta de antes. Com linhas
+        # repetidas, as duas pontas se sobrepõem e não dá para saber de qual linha antiga
+        # vieram as tags que o widget manteve
+        shifted_from = len(lines) - same_tail
+        if old_lines:
+            # Linhas iguais às de antes ainda podem ter caracteres digitados agora
+            touched_first, touched_last = self._touched_lines(content, lines, first, same_tail)
+            first = min(first, touched_first)
+            shifted_from = max(shifted_from, touched_last + 1)
+        unchanged_from = max(shifted_from, first)
+
+        old_states = self.states
+        if self.lexer.mode is None:
+            start, end, states, probes = 0, None, [], []
+            tokens = list(self.lexer.lexer.get_tokens_unprocessed(content))
+        else:
+            start, base = self._restart(content, lines, first) if old_states else (0, 0)
+
+            def stop(line, state):
+                # Pilha igual à de antes, já no texto que não mudou: daqui para baixo nada muda
+                return (line >= unchanged_from and line > start
+                        and old_states[line - delta] == state)
+
+            tokens, states, probes, end = self.lexer.scan(
+                content[base:], lines, start, old_states[start] if start else ("root",), stop)
+
+        count = (len(lines) if end is None else end) - start
+        ranges = self._line_ranges(tokens, count)
+
+        # Linhas a retocar no widget: as editadas e as que mudaram de intervalos
+        old_ranges = self.ranges
+        changed = []
+        for line, line_ranges in enumerate(ranges, start):
+            kept, shifted = line < first, line >= shifted_from
+            if ((not kept and not shifted)
+                    or (kept and old_ranges[line] != line_ranges)
+                    or (shifted and old_ranges[line - delta] != line_ranges)):
+                changed.append(line)
+
+        tail = len(lines) if end is None else end
+        if self.lexer.mode is not None:
+            self.states = old_states[:start] + states + old_states[tail - delta:]
+            self.probes = self.probes[:start] + probes + self.probes[tail - delta:]
+        self.ranges = old_ranges[:start] + ranges + old_ranges[tail - delta:]
+        self.content, self.lines = content, lines
+        if changed:
+            self._retag(changed[0], changed[-1], ranges[changed[0] - start:changed[-1] - start + 1])
+
+    def _touched_lines(self, content, lines, first, same_tail):
+        """
+        Primeira e última linha que podem ter caracteres inseridos. O widget guarda as tags
+        por caractere e o texto inserido herda as tags comuns aos dois vizinhos, então uma
+        linha igual à de antes pode ser nova (ex: 'x = 1\n' digitado antes de 'x = 1').
+        Supõe a menor edição que explica a mudança, deslizada para os dois lados.
+        """
+        old_lines = self.lines
+        limit = min(len(lines), len(old_lines))
+        size, old_size = len(content), len(self.content)
+        # Caracteres iguais no começo e no fim dos dois textos
+        prefix = sum(map(len, lines[:first])) + first
+        if first < limit:
+            prefix += _common_prefix(lines[first], old_lines[first])
+        suffix = sum(map(len, lines[len(lines) - same_tail:])) + same_tail
+        if same_tail < limit:
+            suffix += _common_prefix(lines[-1 - same_tail][::-1], old_lines[-1 - same_tail][::-1])
+        prefix, suffix = min(prefix, size, old_size), min(suffix, size, old_size)
+
+        inserted = max(0, size - old_size, size - prefix - suffix)
+        low = max(0, min(prefix, size - suffix) - inserted)
+        high = min(size, max(prefix, size - suffix) + inserted)
+        return content.count("\n", 0, low), content.count("\n", 0, high)
+
+    def _restart(self, content, lines, first):
+        """Linha onde o lexer recomeça e a posição dela no texto."""
+        lexer = self.lexer
+        start = min(max(first - 1, 0), len(self.states) - 1)
+        start = lexer.first_affected_line(self.content, content, lines, self.probes, start)
+        base = sum(map(len, lines[:start])) + start
+        while start > 0 and not lexer.can_resume(content, base, self.states[start]):
+            start -= 1
+            base -= len(lines[start]) + 1
+        return start, base
+
+    def _line_ranges(self, tokens, count):
+        """Intervalos (tag, coluna inicial, coluna final) de 'count' linhas, como em _ranges_from_tokens."""
+        ranges = [[] for _ in range(count)]
+        tag_names = self.highlighter._tag_names
+        row = col = 0
+        previous_type = None
+        for _, token, value in tokens:
+            pieces = value.split("\n") if "\n" in value else (value,)
+            for i, piece in enumerate(pieces):
+                if i:
+                    row, col = row + 1, 0
+                    previous_type = None
+                start, col = col, col + len(piece)
+                if not piece or piece.isspace() or row >= count:
+                    continue
+                token_type = tag_names.get(token) or self.highlighter._tag_name(token)
+                line_ranges = ranges[row]
+                if token_type == previous_type:
+                    line_ranges[-1] = (token_type, line_ranges[-1][1], col)
+                else:
+                    line_ranges.append((token_type, start, col))
+                previous_type = token_type
+        return ranges
+
+    def _retag(self, first, last, ranges):
+        """Troca as tags das linhas first..last (contadas do zero) pelos intervalos dados."""
+        indices = {}
+        for line, line_ranges in enumerate(ranges, first + 1):
+            for token_type, start, end in line_ranges:
+                indices.setdefault(token_type, []).extend((f"{line}.{start}", f"{line}.{end}"))
+
+        for tag in self.tag_types:
+            self.textbox.tag_remove(tag, f"{first + 1}.0", f"{last + 2}.0")
+        for token_type, tag_indices in indices.items():
+            if token_type not in self.tag_types:
+                self.textbox.tag_config(token_type, foreground=self.highlighter._get_color_for_tag(token_type))
+                self.tag_types.add(token_type)
+            self.textbox.tag_add(token_type, *tag_indices)
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from collections import namedtuple
+
+from core.database import SyncResult
+
+# Marca o fim dos arquivos na fila de registros
+_END_OF_FILES = object()
+
+# Resultado da comparação de uma pasta de kits com o manifesto (nomes de arquivo;
+# 'missing' traz os caminhos completos que sumiram da pasta)
+KitScan = namedtuple("KitScan", ["new", "modified", "unchanged", "missing"])
+
+
+def scan_kit_folder(folder_path, manifest):
+    """
+    Classifica os .codekit da pasta comparando mtime/tamanho com o manifesto
+    (Database.get_sync_manifest), sem abrir nenhum arquivo.
+    """
+    folder_path = os.path.abspath(folder_path)
+    new, modified, unchanged = [], [], []
+    seen = set()
+
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".codekit") or not entry.is_file():
+                continue
+            seen.add(entry.path)
+            stat = entry.stat()
+            known = manifest.get(entry.path)
+            if known is None:
+                new.append(entry.name)
+            elif (known[0], known[1]) == (stat.st_mtime_ns, stat.st_size):
+                unchanged.append(entry.name)
+            else:
+                modified.append(entry.name)
+
+    missing = [path for path in manifest if path not in seen and os.path.dirname(path) == folder_path]
+    return KitScan(sorted(new), sorted(modified), sorted(unchanged), sorted(missing))
+
+
+def parse_codekit_file(path, default_category=None, default_version=""):
+    """
+    Lê e valida um arquivo .codekit.
+    Retorna a tupla (category, title, language, code, version) usada por
+    Database.sync_system_snippets ou levanta ValueError/OSError.
+    """
+    with open(path, "rb") as f:
+        return parse_codekit_bytes(f.read(), default_category, default_version)
+
+
+def parse_codekit_bytes(raw, default_category=None, default_version=""):
+    """Mesma validação de parse_codekit_file, a partir do conteúdo já lido."""
+    data = json.loads(raw)
+
+    if not isinstance(data, dict):
+        raise ValueError("Formato de arquivo .codekit inválido.")
+
+    # Verificação flexível de chaves (aceita 'code' ou 'code_content')
+    category = data.get("category") or default_category
+    title = data.get("title")
+    language = data.get("language")
+    code = data.get("code") or data.get("code_content")
+    version = data.get("version", default_version)
+
+    missing = [name for name, value in
+               (("category", category), ("title", title), ("language", language), ("code", code))
+               if not value]
+    if missing:
+        raise ValueError(f"Campos faltando: {', '.join(missing)}")
+
+    # Tipos errados (ex: "code": 123) viram erro deste arquivo, e não do lote inteiro na gravação
+    invalid = [name for name, value in
+               (("category", category), ("title", title), ("language", language), ("code", code))
+               if not isinstance(value, str)]
+    if version is None:
+        version = default_version
+    if isinstance(version, bool) or not isinstance(version, (str, int, float)):
+        invalid.append("version")
+    if invalid:
+        raise ValueError(f"Campos com tipo inválido: {', '.join(invalid)}")
+
+    return (category, title, language, code, version)
+
+
+class KitImportJob:
+    """
+    Pipeline de importação de arquivos .codekit fora da thread do Tk:
+    os arquivos são lidos/validados num thread pool, os registros passam por uma
+    fila limitada e um único writer grava no banco em lotes (sync_system_snippets).
+    Progresso, erros por arquivo e o resultado final chegam à UI via attach().
+
+    Com um manifesto (Database.get_sync_manifest) a importação é incremental:
+    arquivos com mesmo mtime/tamanho nem são abertos, os com mesmo hash não são
+    regravados, e o manifesto é atualizado junto com cada lote gravado.
+    """
+
+    def __init__(self, db, paths, default_category=None, default_version="",
+                 manifest=None, max_workers=None, batch_size=500, queue_size=256):
+        self.db = db
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.manifest = manifest
+        self.default_category = default_category
+        self.default_version = default_version
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.cancelled = False
+
+        self._records = queue.Queue(maxsize=queue_size)
+        self._events = queue.Queue()
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._read_files, name="codekit-import-reader", daemon=True).start()
+        threading.Thread(target=self._write_records, name="codekit-import-writer", daemon=True).start()
+        return self
+
+    def cancel(self):
+        """Interrompe a importação; lotes já gravados permanecem no banco."""
+        self.cancelled = True
+        self._stop.set()
+
+    def attach(self, widget, on_progress=None, on_error=None, on_done=None, interval=50):
+        """
+        Entrega os eventos na thread do Tk, drenando a fila com widget.after().
+        on_progress(processed, total), on_error(path, message),
+        on_done(result, errors, cancelled).
+        """
+        def drain():
+            progress = None
+            while True:
+                try:
+                    kind, *args = self._events.get_nowait()
+                except queue.Empty:
+                    break
+
+                if kind == "progress":
+                    progress = args # Só o último progresso interessa para a tela
+                elif kind == "error":
+                    if on_error: on_error(*args)
+                else:
+                    if progress and on_progress: on_progress(*progress)
+                    if on_done: on_done(*args)
+                    return
+
+            if progress and on_progress: on_progress(*progress)
+            widget.after(interval, drain)
+
+        widget.after(interval, drain)
+
+    # --- Threads de trabalho ---
+
+    def _read_files(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="codekit-parse") as pool:
+            for path in self.paths:
+                if self._stop.is_set():
+                    break
+                pool.submit(self._parse_file, path)
+        self._put(_END_OF_FILES)
+
+    def _parse_file(self, path):
+        if self._stop.is_set():
+            return
+        try:
+            if self.manifest is None:
+                record = parse_codekit_file(path, self.default_category, self.default_version)
+                self._put((path, "record", (record, None)))
+                return
+
+            stat = os.stat(path)
+            known = self.manifest.get(path)
+            if known and (known[0], known[1]) == (stat.st_mtime_ns, stat.st_size):
+                self._put((path, "unchanged", None))
+                return
+
+            with open(path, "rb") as f:
+                raw = f.read()
+            fingerprint = (stat.st_mtime_ns, stat.st_size, hashlib.sha256(raw).hexdigest())
+            if known and known[2] == fingerprint[2]:
+                # Só o mtime mudou: conteúdo idêntico, atualiza apenas o manifesto
+                self._put((path, "unchanged", fingerprint))
+                return
+
+            record = parse_codekit_bytes(raw, self.default_category, self.default_version)
+            self._put((path, "record", (record, fingerprint)))
+        except (OSError, ValueError) as e:
+            self._put((path, "error", str(e)))
+
+    def _put(self, item):
+        # Bloqueia enquanto a fila estiver cheia, mas respeita o cancelamento
+        while not self._stop.is_set():
+            try:
+                self._records.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _write_records(self):
+        total = SyncResult(0, 0, 0, 0)
+        errors = 0
+        processed = 0
+        skipped = 0
+        batch = []
+        manifest_entries = []
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = self._records.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _END_OF_FILES:
+                    break
+
+                path, kind, payload = item
+                processed += 1
+                if kind == "error":
+                    errors += 1
+                    self._events.put(("error", path, payload))
+                elif kind == "unchanged":
+                    skipped += 1
+                    if payload: manifest_entries.append((path, *payload))
+                else:
+                    record, fingerprint = payload
+                    batch.append(record)
+                    if fingerprint: manifest_entries.append((path, *fingerprint))
+
+                if len(batch) >= self.batch_size:
+                    total = self._flush(batch, manifest_entries, total)
+                self._events.put(("progress", processed, len(self.paths)))
+
+            if (batch or manifest_entries) and not self.cancelled:
+                total = self._flush(batch, manifest_entries, total)
+            total = total._replace(unchanged=total.unchanged + skipped)
+        except sqlite3.Error as e:
+            errors += 1
+            self._events.put(("error", None, f"Erro no banco de dados: {e}"))
+        except Exception as e:
+            # Qualquer outra falha na gravação também aparece como erro, nunca como importação limpa
+            errors += 1
+            self._events.put(("error", None, f"Erro ao gravar os snippets: {e}"))
+        finally:
+            # Esta thread termina aqui: a conexão dela não deve ficar aberta no Database
+            self.db.close_thread_connection()
+            self._stop.set()
+            self._events.put(("done", total, errors, self.cancelled))
+
+    def _flush(self, batch, manifest_entries, total):
+        result = self.db.sync_system_snippets(batch)
+        # O manifesto só avança depois que os snippets do lote foram gravados
+        if manifest_entries:
+            self.db.update_sync_manifest(manifest_entries)
+        batch.clear()
+        manifest_entries.clear()
+        return SyncResult(*(a + b for a, b in zip(total, result)))
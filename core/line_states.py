@@ -0,0 +1,576 @@
+import inspect
+import re
+from itertools import takewhile
+from operator import itemgetter
+
+from pygments.lexer import RegexLexer, ExtendedRegexLexer
+
+try:
+    from re import _parser as sre_parse, _constants as sre
+except ImportError: # Python < 3.11
+    import sre_parse
+    import sre_constants as sre
+
+# Variáveis do laço de RegexLexer.get_tokens_unprocessed lidas durante a execução
+_LOOP_LOCALS = ("pos", "statestack", "rexmatch", "new_state")
+
+_REPEATS = tuple(getattr(sre, name) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+                 if hasattr(sre, name))
+_CHARS = (sre.LITERAL, sre.NOT_LITERAL, sre.ANY, sre.IN)
+_CATEGORIES = {
+    sre.CATEGORY_DIGIT: r"\d", sre.CATEGORY_NOT_DIGIT: r"\D",
+    sre.CATEGORY_SPACE: r"\s", sre.CATEGORY_NOT_SPACE: r"\S",
+    sre.CATEGORY_WORD: r"\w", sre.CATEGORY_NOT_WORD: r"\W",
+}
+_FLAG_LETTERS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s", re.VERBOSE: "x"}
+
+# Até quantas linhas abaixo da própria o alcance de uma sonda é medido; além disso ela
+# é tratada como se pudesse ler o texto inteiro (ex: string aberta que não fecha)
+_MAX_REACH = 8
+_FAR = float("inf")
+_REACH = itemgetter(3)
+
+
+def resume_mode(lexer):
+    """
+    Como o lexer pode ser retomado no início de uma linha:
+    "stack" se get_tokens_unprocessed aceita a pilha de estados (ex: RegexLexer, C/C++),
+    "root" se é um RegexLexer que só começa da raiz (ex: PHP, Lua), None se não dá
+    (ExtendedRegexLexer e lexers escritos à mão, como JSON e Delphi).
+    """
+    if not isinstance(lexer, RegexLexer) or isinstance(lexer, ExtendedRegexLexer):
+        return None
+    if not set(_LOOP_LOCALS) <= set(RegexLexer.get_tokens_unprocessed.__code__.co_varnames):
+        return None # Outra versão do Pygments: sem como ler a pilha
+    parameters = inspect.signature(type(lexer).get_tokens_unprocessed).parameters
+    return "stack" if "stack" in parameters else "root"
+
+
+class LineLexer:
+    """
+    Roda um RegexLexer a partir do início de uma linha e anota, para cada linha, a pilha
+    de estados naquele ponto e as "sondas": as regras de várias linhas tentadas nela.
+    Os tokens vêm do get_tokens_unprocessed do próprio lexer; a pilha é lida do gerador
+    do RegexLexer em andamento (o mesmo laço que o lexer usa por baixo).
+
+    Uma regra de várias linhas é uma regex que, depois de consumir uma quebra de linha,
+    ainda pode ler mais texto (ex: '/\\*.*?\\*/' com DOTALL, ou uma string que aceita
+    quebras). Uma tentativa dela bem acima de uma edição pode ler o trecho editado e
+    mudar de resultado; as outras regras nunca passam do fim da própria linha.
+    Só viram sonda as tentativas que conseguem atravessar a quebra da própria linha, cada
+    uma com seu alcance: quantas linhas abaixo ela pode chegar a ler.
+    """
+
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.mode = resume_mode(lexer)
+        self.rules = _line_rules(lexer._tokens) if self.mode else None
+
+    def can_resume(self, content, base, stack):
+        """
+        True se dá para recomeçar em content[base:], início de uma linha com esta pilha.
+        O lexer recomeça num pedaço do texto: regras com '\\A' ou lookbehind no começo
+        do pedaço podem casar diferente do texto inteiro.
+        """
+        if stack is None:
+            return False
+        text = None
+        if self.mode == "root" and stack != ("root",):
+            # Sem como passar a pilha: serve se, partindo da raiz, o primeiro match
+            # acontece no começo do pedaço já com esta pilha (ex: Lua, que entra em
+            # 'base' por um default sem consumir nada)
+            text = content[base:]
+            tracked = RegexLexer.get_tokens_unprocessed(self.lexer, text)
+            try:
+                for _ in tracked:
+                    local = tracked.gi_frame.f_locals
+                    if local["pos"] != 0 or tuple(local["statestack"]) != stack:
+                        return False
+                    break
+            finally:
+                tracked.close()
+        for rexmatch in self.rules.state(stack[-1]).edge:
+            if text is None:
+                text = content[base:]
+            if _regs(rexmatch(content, base), -base) != _regs(rexmatch(text, 0), 0):
+                return False
+        return True
+
+    def first_affected_line(self, old, new, lines, probes, limit):
+        """
+        Primeira linha antes de 'limit' com uma sonda que dá outro resultado no texto
+        novo ('limit' se nenhuma). 'lines' são as linhas do texto novo (iguais às antigas
+        até 'limit'). Só são tentadas as sondas que alcançam 'limit'; as que continuam
+        iguais têm o alcance medido de novo, já no texto novo (um alcance "longe" continua
+        valendo).
+        """
+        offset = 0
+        for line in range(limit):
+            line_probes = probes[line]
+            if line_probes and line + line_probes[0][3] >= limit:
+                line_end = offset + len(lines[line]) + 1
+                for index, (col, rexmatch, crosses, reach) in enumerate(line_probes):
+                    if line + reach < limit:
+                        break
+                    pos = offset + col
+                    if _regs(rexmatch(old, pos), 0) != _regs(rexmatch(new, pos), 0):
+                        return line
+                    if reach != _FAR:
+                        line_probes[index] = (col, rexmatch, crosses, _reach(crosses, new, pos, line_end))
+                line_probes.sort(key=_REACH, reverse=True)
+            offset += len(lines[line]) + 1
+        return limit
+
+    def scan(self, text, lines, line, stack, stop):
+        """
+        Tokens de 'text', que começa no início da linha 'line' com a pilha 'stack'.
+        Para no início da primeira linha em que stop(linha, pilha) for True.
+        Retorna (tokens, pilhas, sondas, linha onde parou ou None), com uma pilha
+        (None = linha começa no meio de um token) e uma lista de sondas (coluna, regra,
+        teste de travessia, alcance), da que alcança mais longe para a que alcança menos,
+        por linha percorrida.
+        """
+        rules = self.rules
+        tracked = RegexLexer.get_tokens_unprocessed(self.lexer, text, stack)
+        frame = tracked.gi_frame
+
+        tokens, states, probes = [], [stack], [[]]
+        line_start, next_line = 0, len(lines[line]) + 1
+        last_start, previous = -1, (stack, None)
+        end = None
+        for token in tracked:
+            pos = token[0]
+            local = frame.f_locals
+            if pos >= next_line:
+                probes[-1].sort(key=_REACH, reverse=True)
+                while pos >= next_line and line + 1 < len(lines):
+                    line += 1
+                    line_start, next_line = next_line, next_line + len(lines[line]) + 1
+                    states.append(None)
+                    probes.append([])
+                if pos == line_start and local["pos"] == pos:
+                    state = tuple(local["statestack"])
+                    if stop(line, state):
+                        end = line
+                        del states[-1], probes[-1]
+                        break
+                    states[-1] = state
+
+            # Início de um novo match: anota as tentativas que podem passar da linha
+            start = local["pos"]
+            if start != last_start:
+                last_start = start
+                current = tuple(local["statestack"])
+                candidates = rules.candidates(previous, current, local["rexmatch"])
+                line_end = text.find("\n", start) + 1 if candidates else 0
+                if line_end:
+                    line_probes = probes[-1]
+                    for crosses, rexmatch in candidates:
+                        if crosses is None or crosses(text, start, line_end):
+                            reach = _reach(crosses, text, start, line_end)
+                            line_probes.append((start - line_start, rexmatch, crosses, reach))
+                previous = (current, local["new_state"])
+            tokens.append(token)
+
+        probes[-1].sort(key=_REACH, reverse=True)
+        if end is None:
+            states.extend([None] * (len(lines) - line - 1))
+            probes.extend([] for _ in range(len(states) - len(probes)))
+        if type(self.lexer).get_tokens_unprocessed is not RegexLexer.get_tokens_unprocessed:
+            # O lexer trata os tokens do laço (ex: C troca nomes por tipos): usa os dele
+            if self.mode == "stack":
+                own = self.lexer.get_tokens_unprocessed(text, stack)
+            else:
+                own = self.lexer.get_tokens_unprocessed(text)
+            limit = len(text) if end is None else line_start
+            tokens = list(takewhile(lambda token: token[0] < limit, own))
+        return tokens, states, probes, end
+
+
+class _LineRules:
+    """
+    Regras de várias linhas de uma tabela de estados (_tokens) de um RegexLexer.
+    Cada estado é analisado na primeira vez que o lexer passa por ele.
+    """
+
+    def __init__(self, tokendefs):
+        self.tokendefs = tokendefs
+        self._states = {}      # estado -> _StateRules
+        self._reachable = {}   # estado -> estados alcançáveis por regras que não consomem texto
+        self._candidates = {}
+
+    def state(self, name):
+        rules = self._states.get(name)
+        if rules is None:
+            rules = self._states[name] = _StateRules(self.tokendefs.get(name, ()))
+        return rules
+
+    def reachable(self, name):
+        reachable = self._reachable.get(name)
+        if reachable is None:
+            reachable, pending = {name}, [name]
+            while pending:
+                for pushed in self.state(pending.pop()).pushes:
+                    if pushed not in reachable:
+                        reachable.add(pushed)
+                        pending.append(pushed)
+            self._reachable[name] = reachable
+        return reachable
+
+    def candidates(self, previous, current, rexmatch):
+        """
+        (teste de travessia, regra) das regras de várias linhas que podem ter sido
+        tentadas no início de um match: as do estado atual até a que casou ('rexmatch') e
+        as dos estados por onde o lexer pode ter passado sem emitir tokens (regras que não
+        consomem texto, como default('#pop')), entre o match anterior ('previous' =
+        (pilha, transição)) e a pilha atual.
+        """
+        key = (previous, current, rexmatch)
+        candidates = self._candidates.get(key)
+        if candidates is None:
+            stack, new_state = previous
+            visited = set()
+            for name in set(stack) | set(current) | _pushed_states(new_state):
+                visited |= self.reachable(name)
+            # O estado atual só é visitado por último (senão o lexer entraria em laço)
+            state = self.state(current[-1])
+            visited.discard(current[-1])
+
+            matched = state.positions.get(rexmatch, len(state.positions))
+            rules = [rule for name in sorted(visited) for rule in self.state(name).multiline]
+            rules += [rule for rule in state.multiline if rule[0] <= matched]
+            candidates = []
+            for _, info, rule in rules:
+                if (info.crosses, rule) not in candidates:
+                    candidates.append((info.crosses, rule))
+            self._candidates[key] = candidates
+        return candidates
+
+
+class _StateRules:
+    """As regras de um estado que importam para retomar o lexer."""
+
+    def __init__(self, rules):
+        self.multiline = []  # (posição no estado, _RuleInfo, regra)
+        self.positions = {}  # regra -> posição no estado
+        self.edge = []       # regras com '\A' ou lookbehind
+        self.pushes = set()  # estados empilhados por regras que não consomem texto
+        for index, (rexmatch, _, new_state) in enumerate(rules):
+            self.positions[rexmatch] = index
+            info = _rule_info(rexmatch.__self__)
+            if info.multiline:
+                self.multiline.append((index, info, rexmatch))
+            if info.edge:
+                self.edge.append(rexmatch)
+            if info.zero_width:
+                self.pushes.update(_pushed_states(new_state))
+
+
+class _RuleInfo:
+    """Análise de uma regex (feita uma vez, mesmo que ela apareça em vários estados)."""
+
+    def __init__(self, pattern):
+        tree = sre_parse.parse(pattern.pattern, pattern.flags)
+        self.multiline = _reads_past_newline(tree, tree.state.flags)[0]
+        self.edge = _touches_edge(tree)
+        self.zero_width = tree.getwidth()[0] == 0
+        self._pattern, self._tree = pattern, tree if self.multiline else None
+        self._crosses = None
+
+    @property
+    def crosses(self):
+        if self._tree is not None:
+            self._crosses = _crossing_test(self._pattern, self._tree)
+            self._tree = None
+        return self._crosses
+
+
+_rule_infos = {}
+_rules_by_table = {}
+
+
+def _rule_info(pattern):
+    info = _rule_infos.get(pattern)
+    if info is None:
+        info = _rule_infos[pattern] = _RuleInfo(pattern)
+    return info
+
+
+def _line_rules(tokendefs):
+    # Em geral uma tabela por classe, mas há lexers com uma por opção (ex: C#)
+    entry = _rules_by_table.get(id(tokendefs))
+    if entry is None or entry[0] is not tokendefs:
+        entry = _rules_by_table[id(tokendefs)] = (tokendefs, _LineRules(tokendefs))
+    return entry[1]
+
+
+def _reach(crosses, text, start, line_end):
+    """
+    Quantas linhas abaixo da sua a tentativa em 'start' pode ler, sabendo que ela
+    atravessa a quebra da própria linha (que termina em 'line_end').
+    """
+    if crosses is None:
+        return _FAR
+    for reach in range(1, _MAX_REACH + 1):
+        line_end = text.find("\n", line_end) + 1
+        if not line_end or not crosses(text, start, line_end):
+            return reach
+    return _FAR
+
+
+def _regs(match, shift):
+    """Posições do match e dos grupos (deslocadas por 'shift'), para comparar resultados."""
+    if match is None:
+        return None
+    return tuple((start + shift, end + shift) if start >= 0 else (start, end) for start, end in match.regs)
+
+
+def _pushed_states(new_state):
+    if isinstance(new_state, tuple):
+        return {state for state in new_state if not state.startswith("#")}
+    return set()
+
+
+def _char_source(op, av):
+    """Regex de um único caractere do parser do re (None se não der para reproduzir)."""
+    if op is sre.LITERAL:
+        return f"\\U{av:08x}"
+    if op is sre.NOT_LITERAL:
+        return f"[^\\U{av:08x}]"
+    if op is sre.ANY:
+        return "."
+    parts = []
+    for item_op, item in av:
+        if item_op is sre.NEGATE:
+            parts.insert(0, "^")
+        elif item_op is sre.LITERAL:
+            parts.append(f"\\U{item:08x}")
+        elif item_op is sre.RANGE:
+            parts.append(f"\\U{item[0]:08x}-\\U{item[1]:08x}")
+        elif item_op is sre.CATEGORY and item in _CATEGORIES:
+            parts.append(_CATEGORIES[item])
+        else:
+            return None
+    return "[" + "".join(parts) + "]"
+
+
+_NEWLINE = ord("\n")
+_NEWLINE_CATEGORIES = {
+    sre.CATEGORY_SPACE: True, sre.CATEGORY_NOT_SPACE: False, sre.CATEGORY_DIGIT: False,
+    sre.CATEGORY_NOT_DIGIT: True, sre.CATEGORY_WORD: False, sre.CATEGORY_NOT_WORD: True,
+}
+
+
+def _matches_newline(op, av, flags):
+    """True se o caractere da árvore pode ser uma quebra de linha (na dúvida, True)."""
+    if op is sre.ANY:
+        return bool(flags & re.DOTALL)
+    if op is sre.LITERAL:
+        return av == _NEWLINE
+    if op is sre.NOT_LITERAL:
+        return av != _NEWLINE
+    negate, found = False, False
+    for item_op, item in av:
+        if item_op is sre.NEGATE:
+            negate = True
+        elif item_op is sre.LITERAL:
+            found = found or item == _NEWLINE
+        elif item_op is sre.RANGE:
+            found = found or item[0] <= _NEWLINE <= item[1]
+        else:
+            found = found or _NEWLINE_CATEGORIES.get(item, True)
+    return found != negate
+
+
+def _reads_past_newline(items, flags, newline=False):
+    """
+    (pode ler um caractere depois de uma quebra de linha que consumiu, pode terminar
+    tendo consumido uma quebra) para uma sequência da árvore do parser do re.
+    """
+    for op, av in items:
+        if op in _CHARS:
+            if newline:
+                return True, True
+            newline = _matches_newline(op, av, flags)
+        elif op is sre.AT:
+            if newline and av not in (sre.AT_BEGINNING, sre.AT_BEGINNING_STRING):
+                return True, True
+        elif op is sre.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            reads, newline = _reads_past_newline(sub, (flags | add_flags) & ~del_flags, newline)
+            if reads:
+                return True, True
+        elif op is sre.BRANCH:
+            after = False
+            for sub in av[1]:
+                reads, sub_newline = _reads_past_newline(sub, flags, newline)
+                if reads:
+                    return True, True
+                after = after or sub_newline
+            newline = after
+        elif op in _REPEATS:
+            _, high, sub = av
+            reads, sub_newline = _reads_past_newline(sub, flags, newline)
+            if reads or (high > 1 and sub_newline and _reads_past_newline(sub, flags, True)[0]):
+                return True, True
+            newline = newline or sub_newline
+        elif op in (sre.ASSERT, sre.ASSERT_NOT):
+            # Lookbehind só olha para trás; lookahead lê adiante sem consumir
+            if av[0] > 0 and _reads_past_newline(av[1], flags, newline)[0]:
+                return True, True
+        elif op is sre.ATOMIC_GROUP:
+            reads, newline = _reads_past_newline(av, flags, newline)
+            if reads:
+                return True, True
+        else:
+            return True, True # Referência a grupo e afins: na dúvida, lê
+    return False, newline
+
+
+def _crossing_test(pattern, tree):
+    """
+    fullmatch(texto, início, fim de uma linha + 1) que diz se alguma tentativa da regra
+    pode ler até aquela quebra de linha, inclusive (só assim ela lê a linha de baixo), ou
+    None se é preciso sondar sempre (construção não suportada).
+    """
+    source = _prefix_source(tree)
+    if source is None:
+        return None
+    try:
+        return re.compile(source, pattern.flags & ~re.VERBOSE).fullmatch
+    except (re.error, RecursionError, OverflowError):
+        return None
+
+
+# As duas funções abaixo reescrevem a árvore do parser como regex, sem grupos de captura,
+# âncoras e lookarounds (que só restringem o que casa: sem eles o teste fica mais
+# permissivo, nunca menos). Referências a grupo viram "qualquer texto". Nos prefixos, o
+# que um lookahead lê conta como texto lido naquele ponto.
+
+def _full_source(items, repeated=False):
+    """
+    Regex do que a sequência casa. Com 'repeated' (corpo de uma repetição sem limite),
+    'X+' vira 'X', que dá a mesma repetição sem o '(X+)*' que faz o re se perder
+    tentando todas as divisões de um texto que não casa.
+    """
+    consuming = [(op, av) for op, av in items if op is not sre.AT and op not in (sre.ASSERT, sre.ASSERT_NOT)]
+    if repeated and len(consuming) == 1:
+        op, av = consuming[0]
+        if op in _REPEATS and av[0] <= 1 and av[1] == sre.MAXREPEAT:
+            return _full_source(av[2], True)
+        if op is sre.SUBPATTERN and not av[1] and not av[2]:
+            return _full_source(av[3], True)
+        if op is sre.BRANCH:
+            return _alternatives(_full_source(sub, True) for sub in av[1])
+    parts = []
+    for op, av in items:
+        if op in _CHARS:
+            part = _char_source(op, av)
+        elif op is sre.AT or op in (sre.ASSERT, sre.ASSERT_NOT):
+            part = ""
+        elif op is sre.SUBPATTERN:
+            part = _scoped(av[1], av[2], _full_source(av[3]))
+        elif op is sre.BRANCH:
+            part = _alternatives(_full_source(sub) for sub in av[1])
+        elif op in _REPEATS:
+            body = _full_source(av[2], av[1] == sre.MAXREPEAT)
+            part = None if body is None else f"(?:{body}){_count(av[0], av[1])}"
+        elif op is sre.ATOMIC_GROUP:
+            part = _scoped(0, 0, _full_source(av))
+        elif op is sre.GROUPREF:
+            part = r"[\s\S]*"
+        elif op is sre.GROUPREF_EXISTS:
+            part = _alternatives(_full_source(sub) if sub is not None else "" for sub in av[1:])
+        else:
+            part = None
+        if part is None:
+            return None
+        parts.append(part)
+    return "".join(parts)
+
+
+def _prefix_source(items):
+    """Regex dos começos (prefixos) dos textos que a sequência casa."""
+    source = ""
+    for op, av in reversed(items):
+        if op in _CHARS:
+            part = _char_source(op, av)
+            part = None if part is None else f"(?:{part})?"
+        elif op in (sre.ASSERT, sre.ASSERT_NOT) and av[0] > 0:
+            part = _prefix_source(av[1])
+        elif op is sre.AT or op in (sre.ASSERT, sre.ASSERT_NOT):
+            part = ""
+        elif op is sre.SUBPATTERN:
+            part = _scoped(av[1], av[2], _prefix_source(av[3]))
+        elif op is sre.BRANCH:
+            part = _alternatives(_prefix_source(sub) for sub in av[1])
+        elif op in _REPEATS:
+            low, high, sub = av
+            body, prefix = _full_source(sub, high == sre.MAXREPEAT), _prefix_source(sub)
+            if body is None or prefix is None:
+                part = None
+            elif high == 0:
+                part = ""
+            else:
+                part = f"(?:{body}){_count(0, high if high == sre.MAXREPEAT else high - 1)}(?:{prefix})"
+        elif op is sre.ATOMIC_GROUP:
+            part = _scoped(0, 0, _prefix_source(av))
+        elif op is sre.GROUPREF:
+            part = r"[\s\S]*"
+        elif op is sre.GROUPREF_EXISTS:
+            part = _alternatives(_prefix_source(sub) if sub is not None else "" for sub in av[1:])
+        else:
+            part = None
+        full = _full_source([(op, av)])
+        if part is None or full is None:
+            return None
+        # Começo deste item, ou ele inteiro seguido de um começo do resto
+        source = f"(?:{part}|{full}{source})" if source else part
+    return source
+
+
+def _scoped(add_flags, del_flags, body):
+    if body is None or (add_flags | del_flags) & ~sum(_FLAG_LETTERS):
+        return None
+    if not add_flags and not del_flags:
+        return f"(?:{body})"
+    added = "".join(letter for flag, letter in _FLAG_LETTERS.items() if add_flags & flag)
+    removed = "".join(letter for flag, letter in _FLAG_LETTERS.items() if del_flags & flag)
+    return f"(?{added}{'-' + removed if removed else ''}:{body})"
+
+
+def _alternatives(sources):
+    sources = list(sources)
+    if None in sources:
+        return None
+    return "(?:" + "|".join(sources) + ")"
+
+
+def _count(low, high):
+    return f"{{{low},}}" if high == sre.MAXREPEAT else f"{{{low},{high}}}"
+
+
+def _touches_edge(items):
+    """True se a regex usa '\\A' ou lookbehind (que olham antes da posição inicial)."""
+    for op, av in items:
+        if op is sre.AT and av is sre.AT_BEGINNING_STRING:
+            return True
+        if op in (sre.ASSERT, sre.ASSERT_NOT):
+            if av[0] < 0 or _touches_edge(av[1]):
+                return True
+        elif op is sre.SUBPATTERN:
+            if _touches_edge(av[3]):
+                return True
+        elif op is sre.BRANCH:
+            if any(_touches_edge(sub) for sub in av[1]):
+                return True
+        elif op in _REPEATS:
+            if _touches_edge(av[2]):
+                return True
+        elif op is sre.ATOMIC_GROUP:
+            if _touches_edge(av):
+                return True
+        elif op is sre.GROUPREF_EXISTS:
+            if any(sub is not None and _touches_edge(sub) for sub in av[1:]):
+                return True
+    return False
@@ -0,0 +1,47 @@
+"""
+Comandos de manutenção do banco do CodeKit.
+
+    python -m core.maintenance report   [--db CAMINHO]
+    python -m core.maintenance compress [--db CAMINHO] [--threshold BYTES]
+
+Em produção o banco fica em %APPDATA%\\CodeKit\\codekit.db.
+"""
+import argparse
+
+from core.database import Database
+
+DEFAULT_THRESHOLD = 4096
+
+
+def _format_report(label, report):
+    return (
+        f"{label}: {report.bodies} corpos ({report.compressed} comprimidos) | "
+        f"código {report.plain_bytes:,} bytes -> armazenado {report.stored_bytes:,} bytes | "
+        f"arquivo {report.file_bytes:,} bytes"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.maintenance", description="Manutenção do banco do CodeKit.")
+    parser.add_argument("command", choices=["report", "compress"])
+    parser.add_argument("--db", default="codekit.db", help="caminho do codekit.db")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD,
+                        help="comprime corpos maiores que este tamanho em bytes (padrão: %(default)s)")
+    args = parser.parse_args(argv)
+
+    db = Database(db_name=args.db)
+    try:
+        if args.command == "report":
+            print(_format_report("Atual", db.storage_report()))
+        else:
+            before, after = db.compress_existing_bodies(args.threshold)
+            print(_format_report("Antes ", before))
+            print(_format_report("Depois", after))
+            saved = before.file_bytes - after.file_bytes
+            print(f"Economia no arquivo: {saved:,} bytes")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
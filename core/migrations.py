@@ -0,0 +1,335 @@
+import sqlite3
+
+from core.compression import content_hash
+
+# Migrações do esquema do codekit.db, controladas por PRAGMA user_version.
+# Cada passo roda uma única vez, dentro da própria transação; a versão do banco
+# é o número de passos já aplicados. Passos novos entram SEMPRE no fim da lista.
+#
+# Bancos anteriores a este controle têm user_version = 0 e podem estar em qualquer
+# estado intermediário, por isso os passos verificam o que já existe antes de agir.
+
+FTS_TRIGGERS = ("snippets_fts_insert", "snippets_fts_delete", "snippets_fts_update")
+
+
+def _columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _exists(cursor, kind, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (kind, name))
+    return cursor.fetchone() is not None
+
+
+def _create_base_schema(cursor):
+    """Tabelas originais (categorias e snippets com o código inline) e kits iniciais."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            icon TEXT
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS snippets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id INTEGER,
+            title TEXT NOT NULL,
+            language TEXT NOT NULL,
+            code_content TEXT NOT NULL,
+            version TEXT DEFAULT '',
+            is_custom INTEGER DEFAULT 0,
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+    ''')
+
+    # Colunas que bancos muito antigos não têm
+    columns = _columns(cursor, "snippets")
+    if "version" not in columns:
+        cursor.execute("ALTER TABLE snippets ADD COLUMN version TEXT DEFAULT ''")
+    if "is_custom" not in columns:
+        cursor.execute("ALTER TABLE snippets ADD COLUMN is_custom INTEGER DEFAULT 0")
+
+    cursor.execute("SELECT COUNT(*) FROM categories")
+    if cursor.fetchone()[0] == 0:
+        kits = [
+            ("Documentos", "📄"), ("Matemática", "🔢"), ("Strings", "🔤"),
+            ("Datas", "📅"), ("Arrays", "📊"), ("Arquivos", "📁"),
+            ("Redes", "🌐"), ("Segurança", "🔒"), ("Utilitários", "⚡"),
+            ("Algoritmos", "🧠"), ("Meus Snippets", "📂")
+        ]
+        cursor.executemany("INSERT OR IGNORE INTO categories (name, icon) VALUES (?, ?)", kits)
+
+
+def _add_system_title_index(cursor):
+    """
+    Índice único (categoria, título) dos snippets PADRÃO, usado pelo upsert da sincronização.
+    Antes de criá-lo, remove duplicatas antigas mantendo a mais recente.
+    """
+    if _exists(cursor, "index", "idx_snippets_system_title"):
+        return
+    cursor.execute('''
+        DELETE FROM snippets
+        WHERE is_custom = 0 AND id NOT IN (
+            SELECT MAX(id) FROM snippets WHERE is_custom = 0 GROUP BY category_id, title
+        )
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX idx_snippets_system_title
+        ON snippets (category_id, title) WHERE is_custom = 0
+    ''')
+
+
+def _add_sync_manifest(cursor):
+    """Manifesto da sincronização de kits: permite pular arquivos que não mudaram."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_manifest (
+            source_path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            content_hash TEXT NOT NULL
+        )
+    ''')
+
+
+def _move_bodies_to_content_store(cursor):
+    """
+    Move o código de snippets.code_content para snippet_contents (deduplicado pelo hash)
+    e recria a tabela snippets com a coluna content_id.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS snippet_contents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_hash TEXT NOT NULL UNIQUE,
+            body TEXT NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    if "code_content" in _columns(cursor, "snippets"):
+        # O índice FTS antigo aponta para snippets.code_content; é recriado em _add_full_text_search
+        for trigger in FTS_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        try:
+            cursor.execute("DROP TABLE IF EXISTS snippets_fts")
+        except sqlite3.OperationalError as e:
+            print(f"Não foi possível remover o índice FTS antigo: {e}")
+        cursor.execute("DROP VIEW IF EXISTS snippet_documents")
+
+        cursor.execute("SELECT id, category_id, title, language, code_content, version, is_custom FROM snippets")
+        rows = [(*row[:4], content_hash(row[4]), row[4], *row[5:]) for row in cursor.fetchall()]
+        cursor.executemany(
+            "INSERT INTO snippet_contents (content_hash, body) VALUES (?, ?) ON CONFLICT (content_hash) DO NOTHING",
+            [(row[4], row[5]) for row in rows]
+        )
+
+        cursor.execute('''
+            CREATE TABLE snippets_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                category_id INTEGER,
+                title TEXT NOT NULL,
+                language TEXT NOT NULL,
+                content_id INTEGER NOT NULL,
+                version TEXT DEFAULT '',
+                is_custom INTEGER DEFAULT 0,
+                FOREIGN KEY (category_id) REFERENCES categories (id),
+                FOREIGN KEY (content_id) REFERENCES snippet_contents (id)
+            )
+        ''')
+        cursor.executemany('''
+            INSERT INTO snippets_new (id, category_id, title, language, content_id, version, is_custom)
+            VALUES (?, ?, ?, ?, (SELECT id FROM snippet_contents WHERE content_hash = ?), ?, ?)
+        ''', [(*row[:5], *row[6:]) for row in rows])
+        cursor.execute("DROP TABLE snippets")
+        cursor.execute("ALTER TABLE snippets_new RENAME TO snippets")
+        cursor.execute('''
+            CREATE UNIQUE INDEX idx_snippets_system_title
+            ON snippets (category_id, title) WHERE is_custom = 0
+        ''')
+        # Sem este índice cada contagem abaixo varre a tabela inteira (O(N²) na migração)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_snippets_content_id ON snippets (content_id)
+        ''')
+        cursor.execute('''
+            UPDATE snippet_contents
+            SET ref_count = (SELECT COUNT(*) FROM snippets WHERE content_id = snippet_contents.id)
+        ''')
+
+    # Contagem de referências dos corpos; órfãos são apagados por Database._release_orphan_contents
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS snippets_content_ref_insert AFTER INSERT ON snippets BEGIN
+            UPDATE snippet_contents SET ref_count = ref_count + 1 WHERE id = new.content_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS snippets_content_ref_delete AFTER DELETE ON snippets BEGIN
+            UPDATE snippet_contents SET ref_count = ref_count - 1 WHERE id = old.content_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS snippets_content_ref_update AFTER UPDATE OF content_id ON snippets
+        WHEN old.content_id IS NOT new.content_id BEGIN
+            UPDATE snippet_contents SET ref_count = ref_count - 1 WHERE id = old.content_id;
+            UPDATE snippet_contents SET ref_count = ref_count + 1 WHERE id = new.content_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_snippet_contents_orphans
+        ON snippet_contents (id) WHERE ref_count <= 0
+    ''')
+
+
+def _add_body_encoding(cursor):
+    """
+    Formato do corpo (compressão opcional) e tabela de configurações.
+    A view e os triggers do FTS passam a decodificar o corpo e são recriados em seguida.
+    """
+    if "encoding" not in _columns(cursor, "snippet_contents"):
+        cursor.execute("ALTER TABLE snippet_contents ADD COLUMN encoding TEXT NOT NULL DEFAULT 'plain'")
+        cursor.execute("ALTER TABLE snippet_contents ADD COLUMN plain_size INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("UPDATE snippet_contents SET plain_size = length(CAST(body AS BLOB))")
+        for trigger in FTS_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute("DROP VIEW IF EXISTS snippet_documents")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+
+def _add_full_text_search(cursor):
+    """
+    Índice FTS5 (título/linguagem/código) mantido por triggers, preenchido com os
+    snippets existentes ao ser criado. Sem FTS5 no SQLite, a busca fica no LIKE.
+    """
+    # Fonte externa do índice: snippets com o corpo (decodificado) de snippet_contents
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS snippet_documents AS
+        SELECT s.id AS id, s.title AS title, s.language AS language,
+               codekit_decode(b.encoding, b.body) AS code_content
+        FROM snippets s JOIN snippet_contents b ON b.id = s.content_id
+    ''')
+
+    already_exists = _exists(cursor, "table", "snippets_fts")
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS snippets_fts USING fts5(
+                title, language, code_content,
+                content='snippet_documents', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 indisponível, usando busca por LIKE: {e}")
+        return
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS snippets_fts_insert AFTER INSERT ON snippets BEGIN
+            INSERT INTO snippets_fts (rowid, title, language, code_content)
+            VALUES (new.id, new.title, new.language,
+                    (SELECT codekit_decode(encoding, body) FROM snippet_contents WHERE id = new.content_id));
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS snippets_fts_delete AFTER DELETE ON snippets BEGIN
+            INSERT INTO snippets_fts (snippets_fts, rowid, title, language, code_content)
+            VALUES ('delete', old.id, old.title, old.language,
+                    (SELECT codekit_decode(encoding, body) FROM snippet_contents WHERE id = old.content_id));
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS snippets_fts_update AFTER UPDATE OF title, language, content_id ON snippets BEGIN
+            INSERT INTO snippets_fts (snippets_fts, rowid, title, language, code_content)
+            VALUES ('delete', old.id, old.title, old.language,
+                    (SELECT codekit_decode(encoding, body) FROM snippet_contents WHERE id = old.content_id));
+            INSERT INTO snippets_fts (rowid, title, language, code_content)
+            VALUES (new.id, new.title, new.language,
+                    (SELECT codekit_decode(encoding, body) FROM snippet_contents WHERE id = new.content_id));
+        END
+    ''')
+
+    if not already_exists:
+        cursor.execute("INSERT INTO snippets_fts (snippets_fts) VALUES ('rebuild')")
+
+
+def _add_listing_indexes(cursor):
+    """Índices na ordem das listagens paginadas (custom primeiro, título, id)."""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_snippets_category_listing
+        ON snippets (category_id, is_custom DESC, title, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_snippets_custom_listing
+        ON snippets (is_custom, title, id)
+    ''')
+
+
+def _add_highlight_cache(cursor):
+    """Intervalos de highlight já calculados, por (hash do código, linguagem, versão do highlighter)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS highlight_cache (
+            content_hash TEXT NOT NULL,
+            language TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            encoding TEXT NOT NULL DEFAULT 'plain',
+            spans BLOB NOT NULL,
+            PRIMARY KEY (content_hash, language, version)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _add_content_index(cursor):
+    """
+    Índice de snippets por corpo: usado pela leitura dos donos de cada corpo na
+    sincronização (STORED_CONTENT_OWNERS), pelos triggers de ref_count e pela
+    remoção de corpos órfãos. Bancos migrados pelo passo do armazenamento já o têm.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_snippets_content_id ON snippets (content_id)")
+
+
+MIGRATIONS = [
+    _create_base_schema,
+    _add_system_title_index,
+    _add_sync_manifest,
+    _move_bodies_to_content_store,
+    _add_body_encoding,
+    _add_full_text_search,
+    _add_listing_indexes,
+    _add_highlight_cache,
+    _add_content_index,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """
+    Aplica as migrações pendentes e retorna a versão final do esquema.
+    Com o banco já atualizado custa apenas a leitura de PRAGMA user_version.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return version
+
+    conn.commit()
+    cursor = conn.cursor()
+    for number, step in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        # IMMEDIATE: outra instância do app pode estar migrando o mesmo arquivo
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if number > version:
+                step(cursor)
+                cursor.execute(f"PRAGMA user_version = {number}")
+                version = number
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return version
@@ -0,0 +1,57 @@
+import os
+import time
+
+# Medições de tempo da interface, exibidas no terminal quando CODEKIT_TIMINGS=1
+ENABLED = os.environ.get("CODEKIT_TIMINGS") == "1"
+
+
+def now():
+    return time.perf_counter()
+
+
+def report(label, start):
+    """Imprime o tempo decorrido desde 'start' (de now())."""
+    if ENABLED:
+        print(f"[tempo] {label}: {(now() - start) * 1000:.1f} ms")
+
+
+def report_when_idle(widget, label, start):
+    """
+    Como report, mas depois que o Tk processar as tarefas pendentes (geometria e
+    desenho da tela recém-exibida), que é o tempo que o usuário realmente espera.
+    """
+    if ENABLED:
+        widget.after_idle(lambda: report(label, start))
+
+
+class StartupReport:
+    """
+    Marcos da inicialização (imports, janela, banco, primeira tela, primeiro desenho).
+    Cada mark() registra o tempo desde o marco anterior; print_report() mostra a tabela
+    com o total desde o import deste módulo, no mesmo formato a cada versão.
+    """
+
+    def __init__(self):
+        self.start = now()
+        self._last = self.start
+        self.steps = []
+
+    def mark(self, label):
+        current = now()
+        self.steps.append((label, current - self._last))
+        self._last = current
+
+    def total(self):
+        return self._last - self.start
+
+    def print_report(self):
+        if not ENABLED:
+            return
+        print("[tempo] inicialização:")
+        for label, elapsed in self.steps:
+            print(f"[tempo]   {label:<28} {elapsed * 1000:8.1f} ms")
+        print(f"[tempo]   {'total':<28} {self.total() * 1000:8.1f} ms")
+
+
+# Criado no import: main.py importa este módulo antes de todos os outros
+startup = StartupReport()
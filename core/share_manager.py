@@ -10,35 +10,23 @@ class ShareManager:
         """
         Extrai um snippet do banco de dados e guarda-o num ficheiro .codekit.
         """
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT s.title, s.language, s.code_content, c.name 
-            FROM snippets s 
-            JOIN categories c ON s.category_id = c.id 
-            WHERE s.id = ?
-        """
-        cursor.execute(query, (snippet_id,))
-        row = cursor.fetchone()
-        conn.close()
-
-        if not row:
+        snippet = self.db.get_snippet(snippet_id)
+        if not snippet:
             return False
 
         # Estrutura os dados para o ficheiro de partilha
         data_to_export = {
-            "title": row[0],
-            "language": row[1],
-            "code": row[2],
-            "category_origin": row[3]
+            "title": snippet.title,
+            "language": snippet.language,
+            "code": snippet.code,
+            "category_origin": snippet.category_name
         }
         
         # Abre a janela para o utilizador escolher onde guardar
         file_path = filedialog.asksaveasfilename(
             defaultextension=".codekit",
             filetypes=[("CodeKit File", "*.codekit")],
-            initialfile=f"{row[0].replace(' ', '_')}.codekit"
+            initialfile=f"{snippet.title.replace(' ', '_')}.codekit"
         )
         
         if file_path:
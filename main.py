@@ -1,17 +1,19 @@
+from core import perf # Primeiro import: marca o início da inicialização
 import customtkinter as ctk
+perf.startup.mark("import customtkinter")
+from collections import OrderedDict
 from core.database import Database
-from core.share_manager import ShareManager
+from core.async_db import AsyncDatabase
 from ui.dashboard import DashboardScreen
-from ui.viewer import SnippetViewer
-from ui.creation_dialog import CreationDialog
 from ui.styles import COLOR_BG
 from tkinter import filedialog, messagebox
-import json
 import os
 import sys
+import threading
+perf.startup.mark("imports do app")
 
-# Importação da tela de Seeder para o Modo Dev
-from ui.admin_seeder import AdminSeeder 
+# Importados no primeiro uso, fora do caminho da inicialização: viewer/editor (Pygments,
+# via core.highlighter), compartilhamento, importação de kits e o Seeder do Modo Dev
 
 # CONFIGURAÇÃO DE DESENVOLVEDOR: 
 IS_DEV_MODE = False
@@ -40,7 +42,7 @@ def get_db_path():
 
 # --- CLASSE: ASSISTENTE DE IMPORTAÇÃO SELETIVA COM CONTADORES ---
 class ImportWizard(ctk.CTkToplevel):
-    def __init__(self, parent, folder_path, files, on_confirm):
+    def __init__(self, parent, folder_path, files, on_confirm, on_finished, scan=None):
         super().__init__(parent)
         self.title("CodeKit - Assistente de Sincronização")
         self.geometry("550x700")
@@ -49,9 +51,12 @@ class ImportWizard(ctk.CTkToplevel):
         self.attributes("-topmost", True)
         
         self.on_confirm = on_confirm
+        self.on_finished = on_finished
         self.folder_path = folder_path
         self.files = files
         self.checkboxes = []
+        self.job = None
+        self.file_errors = 0
 
         self.configure(fg_color="#F3F4F6")
         
@@ -73,6 +78,12 @@ class ImportWizard(ctk.CTkToplevel):
         )
         ctk.CTkLabel(self, text=info_text, font=("Arial", 12), text_color="#64748B", wraplength=480).pack(pady=5)
 
+        # Resumo da sincronização incremental (arquivos inalterados não aparecem na lista)
+        if scan and (scan.unchanged or scan.missing):
+            scan_text = f"{len(scan.unchanged)} arquivos inalterados desde a última sincronização serão ignorados."
+            if scan.missing: scan_text += f"\n{len(scan.missing)} arquivos sincronizados antes não estão mais na pasta."
+            ctk.CTkLabel(self, text=scan_text, font=("Arial", 11), text_color="#94A3B8", wraplength=480).pack(pady=(0, 5))
+
         # Botões de Seleção Rápida
         link_frame = ctk.CTkFrame(self, fg_color="transparent")
         link_frame.pack(fill="x", padx=40)
@@ -86,8 +97,10 @@ class ImportWizard(ctk.CTkToplevel):
         self.scroll = ctk.CTkScrollableFrame(self, width=480, height=350, fg_color="white", border_width=1, border_color="#E2E8F0")
         self.scroll.pack(pady=10, padx=20)
 
+        modified = set(scan.modified) if scan else set()
         for file in self.files:
             display_name = file.replace(".codekit", "").replace("_", " ").title()
+            if file in modified: display_name += "  (modificado)"
             cb = ctk.CTkCheckBox(self.scroll, text=display_name, font=("Arial", 13), text_color="#1E293B", command=self._update_counter)
             cb.pack(anchor="w", pady=8, padx=10)
             cb.select()
@@ -99,10 +112,17 @@ class ImportWizard(ctk.CTkToplevel):
         btn_frame = ctk.CTkFrame(self, fg_color="transparent")
         btn_frame.pack(side="bottom", fill="x", pady=30, padx=40)
 
-        ctk.CTkButton(btn_frame, text="Cancelar", fg_color="#E2E8F0", text_color="#475569", hover_color="#CBD5E1", 
-                      command=self.destroy).pack(side="left", expand=True, padx=10)
-        ctk.CTkButton(btn_frame, text="Confirmar Importação", fg_color="#3B82F6", hover_color="#2563EB", 
-                      command=self._handle_confirm).pack(side="right", expand=True, padx=10)
+        self.cancel_btn = ctk.CTkButton(btn_frame, text="Cancelar", fg_color="#E2E8F0", text_color="#475569", hover_color="#CBD5E1", 
+                                        command=self._handle_cancel)
+        self.cancel_btn.pack(side="left", expand=True, padx=10)
+        self.confirm_btn = ctk.CTkButton(btn_frame, text="Confirmar Importação", fg_color="#3B82F6", hover_color="#2563EB", 
+                                         command=self._handle_confirm)
+        self.confirm_btn.pack(side="right", expand=True, padx=10)
+
+        # Progresso da importação (aparece após confirmar)
+        self.progress_bar = ctk.CTkProgressBar(self, width=480, progress_color="#3B82F6")
+        self.progress_bar.set(0)
+        self.protocol("WM_DELETE_WINDOW", self._handle_cancel)
 
     def _update_counter(self):
         total_selected = sum(1 for cb, _ in self.checkboxes if cb.get() == 1)
@@ -123,14 +143,43 @@ class ImportWizard(ctk.CTkToplevel):
             return
         
         self.attributes("-topmost", False)
-        self.withdraw()
-        self.on_confirm(self.folder_path, selected_files)
+        self.confirm_btn.configure(state="disabled")
+        for cb, _ in self.checkboxes: cb.configure(state="disabled")
+        self.progress_bar.pack(side="bottom", pady=(0, 5))
+        self.counter_label.configure(text=f"Importando 0 de {len(selected_files)}...")
+
+        # Leitura e gravação rodam em segundo plano; a UI recebe eventos via after()
+        self.job = self.on_confirm(self.folder_path, selected_files)
+        self.job.attach(self, on_progress=self._on_progress, on_error=self._on_error, on_done=self._on_done)
+
+    def _handle_cancel(self):
+        if self.job:
+            self.cancel_btn.configure(state="disabled", text="Cancelando...")
+            self.job.cancel()
+        else:
+            self.destroy()
+
+    def _on_progress(self, processed, total):
+        self.progress_bar.set(processed / total)
+        text = f"Importando {processed} de {total}..."
+        if self.file_errors: text += f" ({self.file_errors} com erro)"
+        self.counter_label.configure(text=text)
+
+    def _on_error(self, path, message):
+        self.file_errors += 1
+        print(f"Erro em {os.path.basename(path) if path else 'importação'}: {message}")
+
+    def _on_done(self, result, errors, cancelled):
         self.destroy()
+        self.on_finished(result, errors, cancelled)
 
 # --- CLASSE PRINCIPAL ---
 class CodeKitApp(ctk.CTk):
+    MAX_CACHED_VIEWERS = 6 # Telas de kit mantidas vivas (as abertas mais recentemente)
+
     def __init__(self):
         super().__init__()
+        perf.startup.mark("janela (Tk)")
         self.wizard_instance = None 
 
         icon_path = resource_path("assets/icon.ico")
@@ -148,7 +197,12 @@ class CodeKitApp(ctk.CTk):
         
         # Inicializa o banco de dados em um local com permissão de escrita
         self.db = Database(db_name=get_db_path())
-        self.share_manager = ShareManager(self.db)
+        # Consultas das telas rodam fora da thread do Tk (ver core.async_db)
+        self.async_db = AsyncDatabase(self.db, self)
+        self._highlighter = None # Ver a propriedade highlighter
+        self._share_manager = None
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        perf.startup.mark("banco de dados")
         
         self.kit_colors = {
             "Documentos": "#3498db", "Matemática": "#2ecc71", "Strings": "#e67e22",
@@ -159,9 +213,47 @@ class CodeKitApp(ctk.CTk):
         
         self.container = ctk.CTkFrame(self, fg_color="transparent")
         self.container.pack(fill="both", expand=True)
+
+        # Telas mantidas vivas entre navegações: o dashboard é criado uma vez e cada kit
+        # aberto fica em cache (ver _show_screen e _show_kit)
+        self.dashboard = None
+        self.footer = None
+        self.viewers = OrderedDict() # categoria -> SnippetViewer
+        self.current_screen = None
         
         if IS_DEV_MODE: self.show_admin_seeder()
         else: self.show_dashboard()
+        perf.startup.mark("primeira tela")
+
+        # Depois do primeiro desenho: relatório de inicialização e, em segundo plano,
+        # o import do viewer (Pygments) para o primeiro kit abrir sem esperar por ele
+        self.after_idle(self._on_first_paint)
+
+    def _on_first_paint(self):
+        perf.startup.mark("primeiro desenho")
+        perf.startup.print_report()
+        threading.Thread(target=self._preload_modules, name="codekit-preload", daemon=True).start()
+
+    def _preload_modules(self):
+        try:
+            import ui.viewer
+        except Exception as e:
+            print(f"Erro ao pré-carregar o viewer: {e}")
+
+    @property
+    def highlighter(self):
+        """Um highlighter para todas as telas (cache de highlight compartilhado), criado no primeiro uso."""
+        if self._highlighter is None:
+            from core.highlighter import SyntaxHighlighter
+            self._highlighter = SyntaxHighlighter(store=self.db)
+        return self._highlighter
+
+    @property
+    def share_manager(self):
+        if self._share_manager is None:
+            from core.share_manager import ShareManager
+            self._share_manager = ShareManager(self.db)
+        return self._share_manager
 
     def _center_window(self):
         screen_width = self.winfo_screenwidth()
@@ -170,88 +262,173 @@ class CodeKitApp(ctk.CTk):
         y = (screen_height // 2) - (self.height // 2)
         self.geometry(f"+{x}+{y}")
 
+    def _on_close(self):
+        """Fecha as conexões do banco antes de destruir a janela."""
+        if perf.ENABLED:
+            stats = self.db.cache_stats()
+            print(f"Cache de consultas: {stats.hits} acertos, {stats.misses} consultas ao banco")
+        if self._highlighter is not None:
+            if perf.ENABLED:
+                hl = self._highlighter.cache_stats()
+                print(f"Cache de highlight: {hl.memory_hits} da memória, {hl.store_hits} do banco, {hl.misses} calculados")
+            self._highlighter.shutdown()
+        self.async_db.shutdown()
+        self.db.close()
+        self.destroy()
+
     def show_admin_seeder(self):
+        from ui.admin_seeder import AdminSeeder
         for child in self.container.winfo_children(): child.destroy()
+        self.dashboard, self.footer, self.current_screen = None, None, None
+        self.viewers.clear()
         self.seeder = AdminSeeder(self.container, self.db, self.show_dashboard)
-        self.seeder.pack(fill="both", expand=True)
+        self._show_screen(self.seeder)
+
+    def _show_screen(self, screen):
+        """Troca a tela visível. Dashboard e kits só saem do layout; outras telas são destruídas."""
+        previous = self.current_screen
+        if previous is not None and previous is not screen:
+            if previous is self.dashboard or previous in self.viewers.values():
+                previous.pack_forget()
+            else:
+                previous.destroy()
+        if self.footer is not None:
+            self.footer.pack_forget()
+
+        self.current_screen = screen
+        screen.pack(fill="both", expand=True)
+        if screen is self.dashboard:
+            self.footer.pack(side="bottom", fill="x", padx=20, pady=10)
 
     def show_dashboard(self):
-        for child in self.container.winfo_children(): child.destroy()
+        start = perf.now()
+        # Um kit que ainda estava carregando não deve mais abrir por cima do dashboard
+        self.async_db.cancel(self.container, "screen")
         
         all_categories = self.db.get_categories()
         filtered_categories = [c for c in all_categories if c[1] != "Meus Snippets"]
         
-        self.dashboard = DashboardScreen(
-            self.container, 
-            categories=filtered_categories,
-            on_category_select=self.open_kit,
-            on_create_new=lambda: self.open_kit("Meus Snippets"),
-            on_sync_kits=self.start_sync_wizard 
-        )
-        self.dashboard.pack(fill="both", expand=True)
-
-        total = self.db.get_total_snippets_count()
-        footer = ctk.CTkFrame(self.container, fg_color="transparent", height=30)
-        footer.pack(side="bottom", fill="x", padx=20, pady=10)
-        ctk.CTkLabel(footer, text=f"Total de Snippets Salvos: {total}", font=("Arial", 11), text_color="#94A3B8").pack(side="right")
+        if self.dashboard is None:
+            self.dashboard = DashboardScreen(
+                self.container, 
+                categories=filtered_categories,
+                on_category_select=self.open_kit,
+                on_create_new=lambda: self.open_kit("Meus Snippets"),
+                on_sync_kits=self.start_sync_wizard 
+            )
+            self.footer = ctk.CTkFrame(self.container, fg_color="transparent", height=30)
+            self.total_label = ctk.CTkLabel(self.footer, text="", font=("Arial", 11), text_color="#94A3B8")
+            self.total_label.pack(side="right")
+            status = "nova"
+        else:
+            # Reaproveitada: só cards (se as categorias mudaram), busca e contagem
+            self.dashboard.update_categories(filtered_categories)
+            self.dashboard.refresh()
+            status = "reaproveitada"
+
+        # A contagem vem da thread do banco; os cards aparecem sem esperar por ela
+        self.async_db.request(self.footer, "count", self.db.get_total_snippets_count,
+                              on_result=lambda total: self.total_label.configure(text=f"Total de Snippets Salvos: {total}"))
+        self._show_screen(self.dashboard)
+        perf.report_when_idle(self, f"navegação: dashboard ({status})", start)
 
     def start_sync_wizard(self):
         folder_path = filedialog.askdirectory(title="Selecione a pasta de atualização (Kits Padrão)")
         if not folder_path: return
-        files = [f for f in os.listdir(folder_path) if f.endswith('.codekit')]
+        self.async_db.request(self, "sync", self._scan_sync_folder, folder_path,
+                              on_result=lambda result: self._show_sync_wizard(folder_path, *result))
+
+    def _scan_sync_folder(self, folder_path):
+        """Roda na thread do banco: compara a pasta com o manifesto (só mtime/tamanho)."""
+        from core.kit_importer import scan_kit_folder
+        manifest = self.db.get_sync_manifest(folder_path)
+        scan = scan_kit_folder(folder_path, manifest)
+        if scan.missing:
+            print(f"{len(scan.missing)} arquivos sincronizados anteriormente não existem mais:")
+            for path in scan.missing: print(f"  - {path}")
+        return scan, manifest
+
+    def _show_sync_wizard(self, folder_path, scan, manifest):
+        self._sync_manifest = manifest
+        self._sync_missing = scan.missing
+        files = scan.new + scan.modified
         if not files:
-            messagebox.showwarning("Aviso", "Nenhum arquivo .codekit encontrado.")
+            if scan.unchanged:
+                messagebox.showinfo("Sincronização", f"Nenhuma alteração encontrada.\n{len(scan.unchanged)} kits já estão atualizados.")
+            else:
+                messagebox.showwarning("Aviso", "Nenhum arquivo .codekit encontrado.")
             return
         
-        self.wizard_instance = ImportWizard(self, folder_path, files, self.process_sync_import)
+        self.wizard_instance = ImportWizard(self, folder_path, files, self.process_sync_import, self.finish_sync_import, scan=scan)
 
     def process_sync_import(self, folder_path, selected_files):
-        count = 0
-        for file_name in selected_files:
-            # Uso de path absoluto para garantir que o .exe encontre os arquivos
-            full_file_path = os.path.join(folder_path, file_name)
-            try:
-                with open(full_file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.db.update_system_snippets(
-                        category_name=data.get('category', 'Utilitários'),
-                        title=data['title'], language=data['language'],
-                        code=data['code'], version=data.get('version', '1.0')
-                    )
-                    count += 1
-            except Exception as e: print(f"Erro em {file_name}: {e}")
-        
+        from core.kit_importer import KitImportJob
+        # Uso de path absoluto para garantir que o .exe encontre os arquivos
+        folder_path = os.path.abspath(folder_path)
+        paths = [os.path.join(folder_path, file_name) for file_name in selected_files]
+        # Só depois da confirmação: cancelar o assistente não pode mexer no manifesto
+        if self._sync_missing:
+            self.db.remove_sync_manifest(self._sync_missing)
+            self._sync_missing = []
+        job = KitImportJob(self.db, paths, default_category='Utilitários', default_version='1.0',
+                           manifest=self._sync_manifest)
+        return job.start()
+
+    def finish_sync_import(self, result, errors, cancelled):
         self.update() 
         self.focus_force()
-        messagebox.showinfo("Sucesso", f"Sincronização concluída!\n{count} snippets adicionados.", parent=self)
+        heading = "Sincronização cancelada!" if cancelled else "Sincronização concluída!"
+        summary = (
+            f"{heading}\n{result.inserted} novos, {result.updated} atualizados, "
+            f"{result.unchanged} sem alterações."
+        )
+        if result.duplicates: summary += f"\n{result.duplicates} com código idêntico a snippets existentes (armazenado uma única vez)."
+        if errors: summary += f"\n{errors} arquivos com erro (veja o terminal)."
+        messagebox.showinfo("Aviso" if cancelled else "Sucesso", summary, parent=self)
         self.show_dashboard()
 
     def open_kit(self, category_name):
-        snippets = self.db.get_snippets_by_category(category_name)
-        all_categories = self.db.get_categories()
-        category_icon = "📂" 
-        for cat in all_categories:
-            if cat[1] == category_name:
-                category_icon = cat[2]
-                break
-        
-        category_color = self.kit_colors.get(category_name, "#1E293B")
-        for child in self.container.winfo_children(): child.destroy()
-
-        self.viewer = SnippetViewer(
-            self.container, category_name=category_name, category_icon=category_icon,
-            category_color=category_color, snippets=snippets, on_back=self.show_dashboard,
-            on_export=self.share_manager.export_snippet, on_add_new=self.open_creation_options,
-            on_edit=self.open_edit_dialog, on_delete=self.handle_delete, is_dev_mode=IS_DEV_MODE 
-        )
-        self.viewer.pack(fill="both", expand=True)
+        start = perf.now()
+        # A listagem é carregada na thread do banco; só o último kit pedido é exibido
+        self.async_db.request(self.container, "screen", self.db.get_snippet_summaries_by_category, category_name,
+                              on_result=lambda snippets: self._show_kit(category_name, snippets, start))
+
+    def _show_kit(self, category_name, snippets, start=None):
+        viewer = self.viewers.get(category_name)
+        if viewer is None:
+            from ui.viewer import SnippetViewer
+            category_icon = self.db.get_category_icon(category_name, default="📂")
+            category_color = self.kit_colors.get(category_name, "#1E293B")
+            viewer = SnippetViewer(
+                self.container, category_name=category_name, category_icon=category_icon,
+                category_color=category_color, snippets=snippets, on_back=self.show_dashboard,
+                on_export=self.share_manager.export_snippet, load_snippet=self.db.get_snippet, on_add_new=self.open_creation_options,
+                on_edit=self.open_edit_dialog, on_delete=self.handle_delete, is_dev_mode=IS_DEV_MODE,
+                highlighter=self.highlighter
+            )
+            self.viewers[category_name] = viewer
+            status = "nova"
+        else:
+            # Reaproveitada: a lista é comparada com a recarregada e só o que mudou é redesenhado
+            self.viewers.move_to_end(category_name)
+            viewer.refresh(snippets)
+            status = "reaproveitada"
+
+        self.viewer = viewer
+        self._show_screen(viewer)
+        while len(self.viewers) > self.MAX_CACHED_VIEWERS:
+            self.viewers.popitem(last=False)[1].destroy()
+        if start is not None:
+            perf.report_when_idle(self, f"navegação: kit {category_name} ({status})", start)
 
     def open_creation_options(self):
+        from ui.creation_dialog import CreationDialog
         CreationDialog(master=self, categories=self.db.get_categories(), on_save=self.save_new_snippet)
 
     def open_edit_dialog(self, snippet_data):
+        from ui.creation_dialog import CreationDialog
         CreationDialog(master=self, categories=self.db.get_categories(), 
-                       on_save=lambda cat, t, l, c, v: self.save_edit(snippet_data[0], cat, t, l, c, v),
+                       on_save=lambda cat, t, l, c, v: self.save_edit(snippet_data.id, cat, t, l, c, v),
                        edit_mode=True, initial_data=snippet_data)
 
     def save_new_snippet(self, category, title, lang, code, version):
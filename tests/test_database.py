@@ -0,0 +1,46 @@
+from core.database import Database, STORED_CONTENT_OWNERS
+
+
+def test_sync_counts_only_rewritten_bodies_as_duplicates(tmp_path):
+    db = Database(str(tmp_path / "codekit.db"))
+    rows = [("A", "t1", "python", "x = 1", "1"), ("A", "t2", "python", "x = 1", "1"), ("B", "t3", "python", "y = 2", "1")]
+
+    assert db.sync_system_snippets(rows) == (3, 0, 0, 1)
+    # Só a versão mudou: nenhum corpo regravado, nenhum duplicado
+    assert db.sync_system_snippets([(*row[:4], "2") for row in rows]) == (0, 3, 0, 0)
+    assert db.sync_system_snippets([(*row[:4], "2") for row in rows]) == (0, 0, 3, 0)
+    db.close()
+
+
+def test_stored_content_owners_uses_content_index(tmp_path):
+    db = Database(str(tmp_path / "codekit.db"))
+    plan = db.get_connection().execute(f"EXPLAIN QUERY PLAN {STORED_CONTENT_OWNERS}", ('["x"]',)).fetchall()
+    assert any("idx_snippets_content_id" in row[-1] for row in plan)
+    db.close()
+
+
+def test_search_ids_follow_search_all_snippets(tmp_path):
+    db = Database(str(tmp_path / "codekit.db"))
+    db.sync_system_snippets([
+        ("Datas", "formatar data", "python", "def format_date(d): return d", "1"),
+        ("Datas", "dias úteis", "python", "# date helper\ndef workdays(): pass", "1"),
+        ("Strings", "inverter", "javascript", "const rev = s => [...s].reverse()", "1"),
+    ])
+    for query in ["date", "dat", "def", "#", "rev"]:
+        ids = db.search_snippet_ids(query)
+        assert ids == [record.id for record in db.search_all_snippets(query)]
+        page = db.get_snippet_page_by_ids(ids, limit=1)
+        assert [record.id for record in page.records] == ids[:1]
+    db.close()
+
+
+def test_generation_bumps_are_not_lost(tmp_path):
+    import threading
+
+    db = Database(str(tmp_path / "codekit.db"))
+    start = db._generation
+    threads = [threading.Thread(target=lambda: [db._bump_generation() for _ in range(2000)]) for _ in range(4)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert db._generation == start + 8000
+    db.close()
@@ -0,0 +1,14 @@
+from pygments.token import Token
+
+from core.highlighter import SyntaxHighlighter
+
+
+def test_token_colors_follow_the_token_hierarchy():
+    highlighter = SyntaxHighlighter(cache_size=0)
+    keyword = highlighter._get_color_for_token(Token.Keyword)
+    assert highlighter._get_color_for_token(Token.Keyword.Constant) == keyword
+    assert highlighter._get_color_for_tag("Token.Keyword.Constant") == keyword
+    assert highlighter._get_color_for_token(Token.Text) == highlighter.default_color
+    # Memo pelo objeto de token, não pelo nome
+    assert Token.Keyword.Constant in highlighter._colors
+    assert all(not isinstance(key, str) for key in highlighter._colors)
@@ -0,0 +1,132 @@
+import random
+
+import pytest
+
+from core.highlighter import SyntaxHighlighter, IncrementalHighlighter
+
+SOURCE = '''class Parser(Base):
+    """Docstring da classe,
+    em mais de uma linha."""
+    def parse(self, data, limit=3):
+        # comentário
+        total = sum(x * 2 for x in data if x > limit)  /* bloco */
+        query = 'SELECT nome
+                 FROM snippets'  -- fim
+        return "resultado: %s" % total, `cmd`, <div>{}</div>
+
+'''
+
+# Trechos que abrem ou fecham construções de várias linhas
+PIECES = ['"""', "'''", '"', "'", "`", "/*", "*/", "#", "--", "//", "{", "}", "(", ")",
+          "<div>", "</div>", "\n", "def ", "x = 1\n", "abc", "--[[", "]]", "=begin\n", "(*", "*)", ""]
+
+
+class FakeText:
+    """Imita as tags de um tkinter.Text: texto inserido herda as tags comuns aos dois vizinhos."""
+
+    def __init__(self, content):
+        self.chars = list(content)
+        self.tags = [set() for _ in self.chars]
+        self.configured = set()
+
+    def content(self):
+        return "".join(self.chars)
+
+    def _offset(self, index):
+        if index.startswith("end"):
+            return len(self.chars)
+        line, col = (int(part) for part in index.split("."))
+        content = self.content()
+        start = 0
+        for _ in range(line - 1):
+            start = content.find("\n", start) + 1
+            if not start:
+                return len(content)
+        line_end = content.find("\n", start)
+        return min(start + col, len(content) if line_end < 0 else line_end)
+
+    def get(self, start, end):
+        return self.content()
+
+    def tag_names(self):
+        return list(self.configured)
+
+    def tag_delete(self, tag):
+        self.configured.discard(tag)
+        for tags in self.tags:
+            tags.discard(tag)
+
+    def tag_config(self, tag, **options):
+        self.configured.add(tag)
+
+    def tag_add(self, tag, *indices):
+        for start, end in zip(indices[::2], indices[1::2]):
+            for tags in self.tags[self._offset(start):self._offset(end)]:
+                tags.add(tag)
+
+    def tag_remove(self, tag, start, end):
+        for tags in self.tags[self._offset(start):self._offset(end)]:
+            tags.discard(tag)
+
+    def edit(self, pos, length, text):
+        before = self.tags[pos - 1] if pos else set()
+        after = self.tags[pos + length] if pos + length < len(self.tags) else set()
+        self.chars[pos:pos + length] = text
+        self.tags[pos:pos + length] = [before & after for _ in text]
+
+    def visible_tags(self):
+        """Tags de cada caractere que não é espaço (nos espaços a cor não aparece)."""
+        return [tags if not char.isspace() else None for char, tags in zip(self.chars, self.tags)]
+
+
+def full_highlight(content, lang):
+    widget = FakeText(content)
+    SyntaxHighlighter(cache_size=0).apply_highlight(widget, content, lang)
+    return widget.visible_tags()
+
+
+@pytest.mark.parametrize("lang", [
+    "python", "sql", "javascript", "html", "bash", "java", "c", "cpp", "objective-c", "php",
+    "ruby", "json", "yaml", "lua", "swift", "elixir", "delphi", "lisp", "portugol",
+])
+def test_incremental_highlight_matches_a_full_pass_after_random_edits(lang):
+    rng = random.Random(lang)
+    widget = FakeText(SOURCE * 3)
+    live = IncrementalHighlighter(SyntaxHighlighter(cache_size=0), widget)
+    live.set_language(lang)
+    live.update()
+    assert widget.visible_tags() == full_highlight(widget.content(), lang)
+
+    for step in range(60):
+        content = widget.content()
+        pos = rng.randrange(len(content) + 1)
+        length = rng.choice([0, 0, 1, 3, 12])
+        text = rng.choice(PIECES)
+        if content[pos:pos + length] == text:
+            continue # Nada mudou no texto
+        widget.edit(pos, length, text)
+        live.update()
+        assert widget.visible_tags() == full_highlight(widget.content(), lang), (
+            f"passo {step}: {text!r} em {pos} (apagando {length})")
+        assert len(live.ranges) == widget.content().count("\n") + 1
+
+
+def test_incremental_highlight_redoes_everything_after_a_language_change():
+    widget = FakeText(SOURCE)
+    live = IncrementalHighlighter(SyntaxHighlighter(cache_size=0), widget)
+    live.set_language("python")
+    live.update()
+    live.set_language("sql")
+    live.update()
+    assert widget.visible_tags() == full_highlight(SOURCE, "sql")
+
+
+def test_incremental_highlight_retags_a_line_typed_over_an_identical_one():
+    # "x = 1\n" digitado no meio de "    x = 1": a linha 1 fica igual, mas os caracteres são novos
+    widget = FakeText("def f():\n    x = 1\n")
+    live = IncrementalHighlighter(SyntaxHighlighter(cache_size=0), widget)
+    live.set_language("python")
+    live.update()
+    widget.edit(len("def f():\n    "), 0, "x = 1\n")
+    live.update()
+    assert widget.visible_tags() == full_highlight(widget.content(), "python")
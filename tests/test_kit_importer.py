@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from core.database import Database
+from core.kit_importer import KitImportJob, parse_codekit_bytes
+
+
+def _codekit(**fields):
+    data = {"category": "Kit", "title": "t", "language": "python", "code": "x = 1", "version": "1"}
+    data.update(fields)
+    return json.dumps(data).encode("utf-8")
+
+
+@pytest.mark.parametrize("fields", [{"code": 123}, {"title": ["a"]}, {"language": {"a": 1}}, {"version": [1]}])
+def test_parse_rejects_wrong_types(fields):
+    with pytest.raises(ValueError):
+        parse_codekit_bytes(_codekit(**fields))
+
+
+def test_parse_accepts_numeric_version():
+    assert parse_codekit_bytes(_codekit(version=2)) == ("Kit", "t", "python", "x = 1", 2)
+
+
+def _run(job):
+    job.start()
+    errors = []
+    while True:
+        kind, *args = job._events.get(timeout=10)
+        if kind == "error":
+            errors.append(args)
+        elif kind == "done":
+            return args, errors
+
+
+def test_bad_file_does_not_drop_the_batch(tmp_path):
+    paths = []
+    for i in range(9):
+        path = tmp_path / f"ok{i}.codekit"
+        path.write_bytes(_codekit(title=f"ok {i}", code=f"x = {i}"))
+        paths.append(str(path))
+    bad = tmp_path / "bad.codekit"
+    bad.write_bytes(_codekit(title="bad", code=123))
+    paths.append(str(bad))
+
+    db = Database(str(tmp_path / "codekit.db"))
+    (total, errors, cancelled), reported = _run(KitImportJob(db, paths))
+    assert total.inserted == 9
+    assert errors == 1 and reported[0][0] == str(bad)
+    assert not cancelled
+    db.close()
+
+
+def test_unexpected_write_error_is_reported(tmp_path, monkeypatch):
+    path = tmp_path / "ok.codekit"
+    path.write_bytes(_codekit())
+    db = Database(str(tmp_path / "codekit.db"))
+
+    def fail(records):
+        raise TypeError("boom")
+    monkeypatch.setattr(db, "sync_system_snippets", fail)
+
+    (total, errors, cancelled), reported = _run(KitImportJob(db, [str(path)]))
+    assert errors == 1 and "boom" in reported[0][1]
+    db.close()
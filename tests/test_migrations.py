@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from core.database import Database
+from core.migrations import SCHEMA_VERSION, _create_base_schema
+
+
+def _baseline_db(path, rows):
+    """Banco no esquema original (user_version 0, código inline em snippets.code_content)."""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    _create_base_schema(cursor)
+    cursor.executemany(
+        "INSERT INTO snippets (category_id, title, language, code_content, version, is_custom) VALUES (?, ?, ?, ?, ?, ?)",
+        [(1 + i % 10, f"snippet {i}", "python", f"def f{i % (rows // 4)}(): pass", "1", i % 7 == 0) for i in range(rows)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_migrates_populated_baseline_db(tmp_path):
+    path = str(tmp_path / "codekit.db")
+    rows = 20000
+    _baseline_db(path, rows)
+
+    start = time.perf_counter()
+    db = Database(path)
+    elapsed = time.perf_counter() - start
+
+    conn = db.get_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM snippets").fetchone()[0] == rows
+    # Cada corpo aparece 4 vezes e foi armazenado uma única vez
+    assert conn.execute("SELECT COUNT(*), MIN(ref_count), MAX(ref_count) FROM snippet_contents").fetchone() == (rows // 4, 4, 4)
+    assert db.get_snippet(1).code == "def f0(): pass"
+
+    # A contagem de referências usa o índice em vez de varrer a tabela a cada corpo
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT COUNT(*) FROM snippets WHERE content_id = 1").fetchall()
+    assert any("idx_snippets_content_id" in row[-1] for row in plan)
+    # Sem o índice esta migração levava minutos (O(N²))
+    assert elapsed < 30
+    db.close()
@@ -1,7 +1,7 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-import json
 import os
+from core.kit_importer import KitImportJob
 
 class AdminSeeder(ctk.CTkFrame):
     def __init__(self, master, db, on_finish, **kwargs):
@@ -32,6 +32,11 @@ class AdminSeeder(ctk.CTkFrame):
                                         font=("Arial", 14), text_color="#F1F5F9")
         self.status_label.pack(pady=10)
 
+        self.progress_bar = ctk.CTkProgressBar(self.content, width=400, progress_color="#10B981")
+        self.cancel_btn = ctk.CTkButton(self.content, text="Cancelar Importação", command=self._cancel_import,
+                                        fg_color="#B91C1C", hover_color="#991B1B", height=36)
+        self.job = None
+
         ctk.CTkButton(self.content, text="Sair do Modo Dev e Abrir App", 
                      command=on_finish, fg_color="transparent", 
                      border_width=1, text_color="#94A3B8", height=40).pack(pady=40)
@@ -43,42 +48,39 @@ class AdminSeeder(ctk.CTkFrame):
         )
         
         if paths:
-            count = 0
-            errors = 0
-            for path in paths:
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    
-                    # Verificação flexível de chaves (ajusta se vier 'code' ou 'code_content')
-                    category = data.get("category")
-                    title = data.get("title")
-                    language = data.get("language")
-                    code = data.get("code") or data.get("code_content")
-                    version = data.get("version", "")
+            # Leitura paralela + gravação em lote fora da thread do Tk
+            self.btn_import.configure(state="disabled")
+            self.progress_bar.set(0)
+            self.progress_bar.pack(pady=(0, 10), after=self.status_label)
+            self.cancel_btn.pack(pady=(0, 10), after=self.progress_bar)
+
+            self.job = KitImportJob(self.db, paths).start()
+            self.job.attach(self, on_progress=self._on_progress, on_error=self._on_error, on_done=self._on_done)
+
+    def _cancel_import(self):
+        if self.job:
+            self.cancel_btn.configure(state="disabled", text="Cancelando...")
+            self.job.cancel()
 
-                    if all([category, title, language, code]):
-                        # Chama o método de inserção de sistema (PADRÃO)
-                        self.db.add_default_snippet(
-                            category, 
-                            title, 
-                            language, 
-                            code, 
-                            version
-                        )
-                        count += 1
-                    else:
-                        print(f"⚠️ Campos faltando no arquivo: {os.path.basename(path)}")
-                        errors += 1
-                        
-                except Exception as e:
-                    print(f"❌ Falha ao processar {path}: {str(e)}")
-                    errors += 1
+    def _on_progress(self, processed, total):
+        self.progress_bar.set(processed / total)
+        self.status_label.configure(text=f"Status: processando {processed} de {total}...")
 
-            if count > 0:
-                messagebox.showinfo("Sucesso", f"Semeadura Concluída!\n{count} snippets adicionados como PADRÃO.")
+    def _on_error(self, path, message):
+        print(f"❌ Falha ao processar {os.path.basename(path) if path else 'lote'}: {message}")
+
+    def _on_done(self, result, errors, cancelled):
+        self.job = None
+        self.progress_bar.pack_forget()
+        self.cancel_btn.pack_forget()
+        self.cancel_btn.configure(state="normal", text="Cancelar Importação")
+        self.btn_import.configure(state="normal")
+
+        count = result.inserted + result.updated + result.unchanged
+        if count > 0:
+            messagebox.showinfo("Sucesso", f"Semeadura {'Interrompida' if cancelled else 'Concluída'}!\n{count} snippets gravados como PADRÃO.")
+        
+        if errors > 0:
+            messagebox.showwarning("Aviso", f"{errors} arquivos falharam. Verifique o terminal para detalhes.")
             
-            if errors > 0:
-                messagebox.showwarning("Aviso", f"{errors} arquivos falharam. Verifique o terminal para detalhes.")
-                
-            self.status_label.configure(text=f"Status: {count} injetados | {errors} falhas.")
\ No newline at end of file
+        self.status_label.configure(text=f"Status: {count} injetados | {errors} falhas.")
\ No newline at end of file
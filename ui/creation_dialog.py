@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from ui.styles import *
-from core.highlighter import SyntaxHighlighter
+from ui.line_numbers import LineNumbers
+from core.highlighter import SyntaxHighlighter, IncrementalHighlighter
 
 class CreationDialog(ctk.CTkToplevel):
     def __init__(self, master, categories, on_save, edit_mode=False, initial_data=None, **kwargs):
@@ -8,9 +9,10 @@ class CreationDialog(ctk.CTkToplevel):
         
         # Armazena os dados de edição
         self.edit_mode = edit_mode
-        self.initial_data = initial_data # (id, cat_id, title, lang, code, version, is_custom, cat_name)
+        self.initial_data = initial_data # SnippetRecord completo (com código)
         self.on_save = on_save
-        self.highlighter = SyntaxHighlighter()
+        self.highlighter = SyntaxHighlighter(cache_size=0) # Texto muda a cada tecla: sem cache
+        self._refresh_job = None # Atualização pendente do editor (uma por ciclo ocioso)
         
         # --- Configuração de Janela ---
         self.width, self.height = 1280, 720
@@ -130,13 +132,8 @@ class CreationDialog(ctk.CTkToplevel):
         self.editor_wrapper.pack(fill="both", expand=True, padx=25, pady=25)
 
         # Calha de números
-        self.line_numbers = ctk.CTkTextbox(
-            self.editor_wrapper, width=50, font=("Consolas", 16), 
-            fg_color="#070b14", text_color="#475569", border_width=0, corner_radius=0,
-            activate_scrollbars=False
-        )
+        self.line_numbers = LineNumbers(self.editor_wrapper, width=50, fg_color="#070b14", text_color="#475569")
         self.line_numbers.pack(side="left", fill="y", padx=(5, 0), pady=10)
-        self.line_numbers.configure(state="disabled")
 
         # Widget de texto principal
         self.txt_code = ctk.CTkTextbox(
@@ -145,11 +142,11 @@ class CreationDialog(ctk.CTkToplevel):
         )
         self.txt_code.pack(side="right", fill="both", expand=True, padx=5, pady=10)
         self.txt_code._textbox.configure(insertbackground="white")
+        self.live_highlight = IncrementalHighlighter(self.highlighter, self.txt_code)
         
-        # Sincronização e Eventos
-        self.txt_code._textbox.configure(yscrollcommand=self._sync_scroll)
+        # Sincronização e Eventos (a calha acompanha a rolagem sozinha)
+        self.line_numbers.attach(self.txt_code)
         self.txt_code.bind("<KeyRelease>", self._on_text_change)
-        self.txt_code.bind("<MouseWheel>", lambda e: self.after(1, self._update_line_numbers))
 
     def _create_label(self, text):
         ctk.CTkLabel(
@@ -157,56 +154,44 @@ class CreationDialog(ctk.CTkToplevel):
             font=(FONT_FAMILY, 10, "bold"), text_color="#64748B"
         ).pack(anchor="w", padx=28, pady=(10, 2))
 
-    def _sync_scroll(self, *args):
-        """Sincroniza os números de linha com o scroll do editor."""
-        self.line_numbers._textbox.yview_moveto(args[0])
-
-    def _update_line_numbers(self):
-        """Atualiza a barra lateral de números baseada na contagem de linhas."""
-        self.line_numbers.configure(state="normal")
-        self.line_numbers.delete("1.0", "end")
-        
-        code_content = self.txt_code.get("1.0", "end-1c")
-        line_count = code_content.count('\n') + 1
-        
-        lines_string = "\n".join(str(i) for i in range(1, line_count + 1))
-        self.line_numbers.insert("1.0", lines_string)
-        
-        self.line_numbers._textbox.tag_add("right", "1.0", "end")
-        self.line_numbers._textbox.tag_config("right", justify="right")
-        self.line_numbers.configure(state="disabled")
-
     def _on_text_change(self, event=None):
-        """Evento disparado ao digitar: atualiza números e highlight."""
-        self._update_line_numbers()
+        """Evento disparado ao digitar: agenda a atualização de números e highlight."""
+        # Várias teclas no mesmo ciclo (ex: tecla repetida) viram uma única atualização
+        if self._refresh_job is None:
+            self._refresh_job = self.after_idle(self._refresh_editor)
+
+    def _refresh_editor(self):
+        self._refresh_job = None
+        self.line_numbers.redraw()
         self._update_highlight()
 
     def _load_edit_data(self):
         """Preenche a tela com os dados vindos do visualizador."""
         # 1. Título
-        self.entry_title.insert(0, self.initial_data[2])
+        self.entry_title.insert(0, self.initial_data.title)
         
         # 2. Categoria (Sincronização Corrigida)
-        if len(self.initial_data) > 7:
-            self.combo_cat.set(self.initial_data[7])
+        if self.initial_data.category_name:
+            self.combo_cat.set(self.initial_data.category_name)
         
         # 3. Linguagem
         for name, key in self.lang_map.items():
-            if key == self.initial_data[3]:
+            if key == self.initial_data.language:
                 self.combo_lang.set(name)
                 break
         
         # 4. Código e Versão
-        self.txt_code.insert("1.0", self.initial_data[4])
-        self.entry_version.insert(0, self.initial_data[5] if self.initial_data[5] else "")
+        self.txt_code.insert("1.0", self.initial_data.code)
+        self.entry_version.insert(0, self.initial_data.version if self.initial_data.version else "")
         
         # 5. Atualizar Visual
-        self._update_line_numbers()
+        self.line_numbers.redraw()
         self._update_highlight()
 
     def _update_highlight(self, event=None):
-        lang = self.lang_map.get(self.combo_lang.get(), "text")
-        self.highlighter.apply_highlight(text_widget=self.txt_code, code=self.txt_code.get("1.0", "end-1c"), lang_name=lang)
+        # Só as linhas afetadas pela edição são refeitas (tudo, se a linguagem mudou)
+        self.live_highlight.set_language(self.lang_map.get(self.combo_lang.get(), "text"))
+        self.live_highlight.update()
 
     def _handle_save(self):
         title = self.entry_title.get()
@@ -217,4 +202,10 @@ class CreationDialog(ctk.CTkToplevel):
         
         if title.strip() and code.strip():
             self.on_save(cat, title, self.lang_map.get(lang_name, "text"), code, version)
-            self.destroy()
\ No newline at end of file
+            self.destroy()
+
+    def destroy(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        super().destroy()
\ No newline at end of file
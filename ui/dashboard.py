@@ -1,5 +1,7 @@
 import customtkinter as ctk
+from core.database import SnippetPage
 from ui.styles import *
+from ui.virtual_list import VirtualList
 
 class CategoryCard(ctk.CTkFrame):
     def __init__(self, master, name, icon, icon_color, command=None, **kwargs):
@@ -48,11 +50,16 @@ class CategoryCard(ctk.CTkFrame):
             self.command()
 
 class DashboardScreen(ctk.CTkFrame):
+    SEARCH_DEBOUNCE_MS = 150    # espera após a última tecla antes de buscar
+
     def __init__(self, master, categories, on_category_select, on_create_new, on_sync_kits=None, **kwargs):
         super().__init__(master, fg_color=COLOR_BG, **kwargs)
         
         self.on_sync_kits = on_sync_kits
         self.on_category_select = on_category_select
+
+        self._search_after = None   # busca agendada (debounce)
+        self._last_search = None    # (texto, ids encontrados) da última busca exibida
         
         self.kit_colors = {
             "Documentos": "#3498db", "Matemática": "#2ecc71", "Strings": "#e67e22",
@@ -92,15 +99,44 @@ class DashboardScreen(ctk.CTkFrame):
         self.grid_wrapper = ctk.CTkFrame(self.main_content, fg_color="transparent")
         self.grid_wrapper.pack(expand=True, fill="both")
 
-        # 2. Container de Resultados de Busca (Inicia Oculto)
-        self.results_wrapper = ctk.CTkScrollableFrame(
-            self.main_content, fg_color=COLOR_BG, corner_radius=15, 
-            border_width=1, border_color="#E2E8F0"
-        )
+        # 2. Lista de Resultados de Busca: criada na primeira busca (ver _results_list)
+        self.results_wrapper = None
+        self._results_query = None
+        self._next_cursor = None
 
         self._render_cards(categories)
 
+    def _results_list(self):
+        """
+        Lista de resultados (inicia oculta), criada só quando a primeira busca é feita para
+        não pesar na abertura do app. Virtualizada: só as linhas visíveis têm widgets.
+        """
+        if self.results_wrapper is None:
+            self.results_wrapper = VirtualList(
+                self.main_content, row_height=63, create_row=self._create_result_row,
+                bind_row=self._bind_result_row, on_need_more=self._load_more,
+                empty_text="Nenhum snippet encontrado.",
+                fg_color=COLOR_BG, corner_radius=15, border_width=1, border_color="#E2E8F0"
+            )
+        return self.results_wrapper
+
+    def update_categories(self, categories):
+        """Redesenha os cards só se as categorias mudaram (ex: depois de sincronizar kits)."""
+        if categories == self.categories:
+            return
+        for card in self.grid_wrapper.winfo_children():
+            card.destroy()
+        self._render_cards(categories)
+
+    def refresh(self):
+        """Ao voltar para o dashboard reaproveitado: refaz a busca exibida (os dados podem ter mudado)."""
+        query = self.search_global.get().strip().lower()
+        if query:
+            self._last_search = None
+            self._run_search(query)
+
     def _render_cards(self, categories):
+        self.categories = categories
         for i in range(4):
             self.grid_wrapper.grid_columnconfigure(i, weight=1)
 
@@ -117,43 +153,112 @@ class DashboardScreen(ctk.CTkFrame):
 
     def _on_global_search(self, event=None):
         query = self.search_global.get().strip().lower()
+
+        # Debounce: cada tecla reinicia a espera; só o texto final é buscado
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+            self._search_after = None
         
         if not query:
             # Se a busca estiver vazia, volta para os cards
-            self.results_wrapper.pack_forget()
+            self.master.master.async_db.cancel(self, "search")
+            self.master.master.async_db.cancel(self, "search_more")
+            self._last_search = None
+            if self.results_wrapper is not None:
+                self.results_wrapper.pack_forget()
             self.grid_wrapper.pack(expand=True, fill="both")
             return
 
+        self._search_after = self.after(self.SEARCH_DEBOUNCE_MS, lambda: self._run_search(query))
+
+    def _run_search(self, query):
+        self._search_after = None
+        db = self.master.master.db
+        async_db = self.master.master.async_db
+        async_db.cancel(self, "search_more")
+
         # Esconde os cards e mostra a lista de busca
         self.grid_wrapper.pack_forget()
-        self.results_wrapper.pack(expand=True, fill="both", pady=(0, 20))
+        self._results_list().pack(expand=True, fill="both", pady=(0, 20))
+
+        # Texto que só estreita a última busca: procura apenas entre os ids dela
+        within = None
+        if self._last_search and db.narrows_search(self._last_search[0], query):
+            previous_query, within = self._last_search
+            if previous_query == query or not within:
+                # Mesmo texto (ex: setas do teclado) ou nada a estreitar: nem vai ao banco
+                async_db.cancel(self, "search")
+                if previous_query != query:
+                    self._last_search = (query, within)
+                    self._show_search_results(query, SnippetPage([], None))
+                return
 
-        # Limpa resultados anteriores
-        for child in self.results_wrapper.winfo_children():
-            child.destroy()
+        def search():
+            # Roda na thread do banco: ids na ordem do ranking, registros só da primeira página
+            ids = db.search_snippet_ids(query, within)
+            return ids, db.get_snippet_page_by_ids(ids)
 
-        # Busca no Banco (Acessando via App -> Database)
-        results = self.master.master.db.search_all_snippets(query)
+        def show(result):
+            ids, page = result
+            self._last_search = (query, ids)
+            self._show_search_results(query, page)
 
-        if not results:
-            ctk.CTkLabel(self.results_wrapper, text="Nenhum snippet encontrado.", font=(FONT_FAMILY, 14), text_color="#64748B").pack(pady=40)
+        # Busca em segundo plano (App -> AsyncDatabase): um pedido novo cancela o anterior
+        # (e interrompe a consulta dele, se já estiver rodando), então só a resposta do
+        # último texto digitado é exibida.
+        async_db.request(self, "search", search, on_result=show, interrupt=True)
+
+    def _show_search_results(self, query, page):
+        self._results_query = query
+        self._next_cursor = page.next_cursor
+        self.results_wrapper.set_items(page.records)
+
+    def _load_more(self):
+        """Chamado pela lista ao rolar perto do fim: busca a próxima página."""
+        if self._next_cursor is None or self._last_search is None:
             return
+        db = self.master.master.db
+        query, offset = self._results_query, self._next_cursor
+        # As próximas páginas são fatias dos ids da busca exibida (nada de refazer a busca)
+        ids = self._last_search[1]
+
+        def show_page(page):
+            if query != self._results_query:
+                return
+            self._next_cursor = page.next_cursor
+            self.results_wrapper.append_items(page.records)
+
+        # Canal próprio (rolar não pode cancelar uma busca nova); cada busca nova cancela este
+        self.master.master.async_db.request(self, "search_more", lambda: db.get_snippet_page_by_ids(ids, offset),
+                                            on_result=show_page)
+
+    def _create_result_row(self, parent):
+        """Widgets de uma linha de resultado, criados uma vez e reaproveitados (ver _bind_result_row)."""
+        row = ctk.CTkFrame(parent, fg_color="transparent", height=63)
+        row.pack_propagate(False)
+        item = ctk.CTkFrame(row, fg_color=COLOR_CARD, height=55, corner_radius=10)
+        item.pack(fill="x", pady=4, padx=10)
+        item.pack_propagate(False)
+
+        # TAGS (Tipo, Kit, Linguagem)
+        row.type_tag = ctk.CTkLabel(item, text="", font=(FONT_FAMILY, 8, "bold"), width=55, height=22, corner_radius=4)
+        row.type_tag.pack(side="left", padx=(15, 5))
+        row.category_tag = ctk.CTkLabel(item, text="", font=(FONT_FAMILY, 8, "bold"), width=85, height=22, fg_color="#F1F5F9", text_color="#64748B", corner_radius=4)
+        row.category_tag.pack(side="left", padx=5)
+        row.language_tag = ctk.CTkLabel(item, text="", font=(FONT_FAMILY, 8, "bold"), width=80, height=22, fg_color="#E2E8F0", text_color="#1E293B", corner_radius=4)
+        row.language_tag.pack(side="left", padx=5)
+
+        # Botão para abrir
+        row.open_btn = ctk.CTkButton(
+            item, text="", anchor="w", fg_color="transparent", text_color=COLOR_TEXT_MAIN, 
+            hover_color="#F1F5F9", font=(FONT_FAMILY, 13, "bold")
+        )
+        row.open_btn.pack(side="left", fill="both", expand=True, padx=15)
+        return row
 
-        for snip in results:
-            # snip: (id, cat_id, title, lang, code, version, is_custom, cat_name)
-            item = ctk.CTkFrame(self.results_wrapper, fg_color=COLOR_CARD, height=55, corner_radius=10)
-            item.pack(fill="x", pady=4, padx=10)
-            item.pack_propagate(False)
-
-            # TAGS (Tipo, Kit, Linguagem)
-            t_text, t_bg, t_col = ("CUSTOM", "#E0F2FE", "#0369A1") if snip[6] else ("PADRÃO", "#FFEDD5", "#C2410C")
-            ctk.CTkLabel(item, text=t_text, font=(FONT_FAMILY, 8, "bold"), width=55, height=22, fg_color=t_bg, text_color=t_col, corner_radius=4).pack(side="left", padx=(15, 5))
-            ctk.CTkLabel(item, text=snip[7].upper(), font=(FONT_FAMILY, 8, "bold"), width=85, height=22, fg_color="#F1F5F9", text_color="#64748B", corner_radius=4).pack(side="left", padx=5)
-            ctk.CTkLabel(item, text=snip[3].upper(), font=(FONT_FAMILY, 8, "bold"), width=80, height=22, fg_color="#E2E8F0", text_color="#1E293B", corner_radius=4).pack(side="left", padx=5)
-
-            # Botão para abrir
-            ctk.CTkButton(
-                item, text=snip[2], anchor="w", fg_color="transparent", text_color=COLOR_TEXT_MAIN, 
-                hover_color="#F1F5F9", font=(FONT_FAMILY, 13, "bold"),
-                command=lambda n=snip[7]: self.on_category_select(n)
-            ).pack(side="left", fill="both", expand=True, padx=15)
\ No newline at end of file
+    def _bind_result_row(self, row, snip):
+        t_text, t_bg, t_col = ("CUSTOM", "#E0F2FE", "#0369A1") if snip.is_custom else ("PADRÃO", "#FFEDD5", "#C2410C")
+        row.type_tag.configure(text=t_text, fg_color=t_bg, text_color=t_col)
+        row.category_tag.configure(text=snip.category_name.upper())
+        row.language_tag.configure(text=snip.language.upper())
+        row.open_btn.configure(text=snip.title, command=lambda n=snip.category_name: self.on_category_select(n))
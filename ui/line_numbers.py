@@ -0,0 +1,83 @@
+import customtkinter as ctk
+
+
+class LineNumbers(ctk.CTkCanvas):
+    """
+    Calha de números de linha de um CTkTextbox que desenha só as linhas visíveis:
+    a posição de cada número vem do dlineinfo do próprio texto (funciona com quebra de
+    linha), e os itens do canvas são reaproveitados. O custo de redesenhar é o mesmo
+    para 10 ou 10.000 linhas, então pode ser chamado a cada tecla ou rolagem.
+    """
+
+    def __init__(self, master, width=45, fg_color="#070b14", text_color="#475569", padding=6, **kwargs):
+        scaling = ctk.ScalingTracker.get_widget_scaling(master)
+        super().__init__(master, width=int(width * scaling), bg=fg_color, highlightthickness=0, bd=0, **kwargs)
+        self.text_color = text_color
+        self.padding = int(padding * scaling)
+
+        self.textbox = None
+        self._scroll_command = None
+        self._items = []        # pool de itens de texto do canvas
+        self._drawn = None      # o que está desenhado, para pular redesenhos iguais
+        self._redraw_job = None
+
+        self.bind("<Configure>", lambda e: self.redraw())
+
+    def attach(self, text_widget):
+        """Acompanha a rolagem e o tamanho do texto (mantendo a scrollbar do CTkTextbox)."""
+        self.textbox = getattr(text_widget, "_textbox", text_widget)
+        self._scroll_command = self.textbox.cget("yscrollcommand")
+        self.textbox.configure(yscrollcommand=self._on_text_scroll)
+        self.textbox.bind("<Configure>", lambda e: self.redraw(), add="+")
+
+    def _on_text_scroll(self, *args):
+        if self._scroll_command:
+            self.textbox.tk.call(self._scroll_command, *args)
+        self.redraw()
+
+    def redraw(self):
+        """Agenda o redesenho (várias chamadas no mesmo ciclo viram uma só)."""
+        if self._redraw_job is None and self.textbox is not None:
+            self._redraw_job = self.after_idle(self._redraw)
+
+    def destroy(self):
+        if self._redraw_job is not None:
+            self.after_cancel(self._redraw_job)
+            self._redraw_job = None
+        super().destroy()
+
+    def _redraw(self):
+        self._redraw_job = None
+        textbox = self.textbox
+
+        # Linhas visíveis: da primeira (topo do texto) até a última com dlineinfo.
+        # Se o topo é a continuação de uma linha quebrada, o início dela ("N.0") está
+        # acima da tela e não tem dlineinfo: essa linha fica sem número
+        first = int(textbox.index("@0,0").split(".")[0])
+        last = int(textbox.index("end-1c").split(".")[0])
+        height = textbox.winfo_height()
+        positions = []
+        for line in range(first, last + 1):
+            info = textbox.dlineinfo(f"{line}.0")
+            if info is None and line == first:
+                continue
+            if info is None or info[1] > height:
+                break
+            positions.append((line, info[1]))
+
+        # O texto do Tk fica dentro do CTkTextbox: alinha pela posição dele na tela
+        offset = textbox.winfo_rooty() - self.winfo_rooty()
+        font = textbox.cget("font")
+        drawn = (tuple(positions), offset, font, self.winfo_width())
+        if drawn == self._drawn:
+            return
+        self._drawn = drawn
+
+        x = self.winfo_width() - self.padding
+        while len(self._items) < len(positions):
+            self._items.append(self.create_text(0, 0, anchor="ne", fill=self.text_color))
+        for item, (line, y) in zip(self._items, positions):
+            self.itemconfigure(item, text=str(line), font=font, state="normal")
+            self.coords(item, x, y + offset)
+        for item in self._items[len(positions):]:
+            self.itemconfigure(item, state="hidden")
@@ -1,6 +1,9 @@
 import customtkinter as ctk
 from ui.styles import *
+from ui.virtual_list import VirtualList
+from ui.line_numbers import LineNumbers
 from core.highlighter import SyntaxHighlighter 
+from core.database import SnippetRecord
 from tkinter import filedialog, messagebox
 import json 
 
@@ -9,12 +12,46 @@ try:
 except ImportError:
     pyperclip = None
 
+class SnippetListModel:
+    """
+    Dados da lista lateral: os snippets da categoria e um índice em minúsculas
+    ("linguagem • título") montado uma única vez, para filtrar sem tocar nos widgets.
+    """
+
+    def __init__(self, snippets):
+        self.snippets = list(snippets)
+        self._keys = [f"{snip.language} • {snip.title}".lower() for snip in self.snippets]
+        self.query = ""
+        self._visible = list(range(len(self.snippets)))
+
+    def filter(self, query):
+        """Retorna os snippets cujo texto contém 'query' (sem diferenciar maiúsculas)."""
+        query = query.lower()
+        if query.startswith(self.query):
+            candidates = self._visible # Texto só cresceu: basta filtrar o resultado anterior
+        else:
+            candidates = range(len(self.snippets))
+        keys = self._keys
+        self._visible = [i for i in candidates if query in keys[i]]
+        self.query = query
+        return [self.snippets[i] for i in self._visible]
+
+
 class SnippetViewer(ctk.CTkFrame):
+    # Acima disso o highlight é feito em etapas (linhas visíveis primeiro, resto em segundo plano)
+    PROGRESSIVE_HIGHLIGHT_CHARS = 20000
+    # Acima disso o texto entra no editor em partes (arquivos inteiros colados como snippet)
+    LARGE_FILE_CHARS = 200000
+    INSERT_CHUNK_CHARS = 65536
+
     def __init__(self, master, category_name, category_icon, category_color, snippets, on_back, on_export, 
-                 on_add_new=None, on_edit=None, on_delete=None, is_dev_mode=False, **kwargs):
+                 load_snippet, on_add_new=None, on_edit=None, on_delete=None, is_dev_mode=False,
+                 highlighter=None, **kwargs):
         super().__init__(master, fg_color=COLOR_BG, **kwargs)
         
-        self.snippets = snippets 
+        self.snippets = snippets # Lista de SnippetRecord (sem código)
+        self.list_model = SnippetListModel(snippets)
+        self.load_snippet = load_snippet # Carrega o snippet completo pelo id
         self.category_name = category_name
         self.category_icon = category_icon 
         self.category_color = category_color 
@@ -23,7 +60,9 @@ class SnippetViewer(ctk.CTkFrame):
         self.on_edit = on_edit
         self.on_delete = on_delete
         self.is_dev_mode = is_dev_mode 
-        self.highlighter = SyntaxHighlighter()
+        self.highlighter = highlighter or SyntaxHighlighter() # Compartilhado pelo app (cache de highlight)
+        self._highlight_job = None # HighlightJob do snippet aberto (textos grandes)
+        self._insert_job = None # after() da próxima parte do texto (modo de arquivo grande)
         
         # --- HEADER ---
         self.top_bar = ctk.CTkFrame(self, fg_color="transparent")
@@ -77,10 +116,10 @@ class SnippetViewer(ctk.CTkFrame):
         self.search_entry.pack(fill="x", pady=(0, 10))
         self.search_entry.bind("<KeyRelease>", self._filter_snippets)
 
-        # Lista Lateral (Scrollable)
-        self.side_list = ctk.CTkScrollableFrame(
-            self.left_panel, fg_color=COLOR_CARD, 
-            corner_radius=20, border_width=1, border_color="#E2E8F0"
+        # Lista Lateral (virtualizada: só as linhas visíveis têm widgets)
+        self.side_list = VirtualList(
+            self.left_panel, row_height=39, create_row=self._create_list_row, bind_row=self._bind_list_row,
+            fg_color=COLOR_CARD, corner_radius=20, border_width=1, border_color="#E2E8F0"
         )
         self.side_list.pack(fill="both", expand=True)
 
@@ -126,88 +165,117 @@ class SnippetViewer(ctk.CTkFrame):
         self.editor_wrapper = ctk.CTkFrame(self.code_container, fg_color="#0F172A", corner_radius=15)
         self.editor_wrapper.pack(fill="both", expand=True, padx=25, pady=25)
 
-        self.line_numbers = ctk.CTkTextbox(
-            self.editor_wrapper, width=45, font=("Consolas", 15), 
-            fg_color="#070b14", text_color="#475569", border_width=0, corner_radius=0,
-            activate_scrollbars=False 
-        )
+        self.line_numbers = LineNumbers(self.editor_wrapper, width=45, fg_color="#070b14", text_color="#475569")
         self.line_numbers.pack(side="left", fill="y", padx=(5, 0), pady=10)
-        self.line_numbers.configure(state="disabled")
 
         self.code_text = ctk.CTkTextbox(
             self.editor_wrapper, font=("Consolas", 15), 
             fg_color="transparent", text_color="#E2E8F0", border_width=0
         )
         self.code_text.pack(side="right", fill="both", expand=True, padx=5, pady=10)
-        
-        self.code_text._textbox.configure(yscrollcommand=self._sync_scroll)
+        self.line_numbers.attach(self.code_text)
 
         self._populate_list()
 
-    def _sync_scroll(self, *args):
-        self.line_numbers._textbox.yview_moveto(args[0])
-
-    def _update_line_numbers(self):
-        self.line_numbers.configure(state="normal")
-        self.line_numbers.delete("1.0", "end")
-        code_content = self.code_text.get("1.0", "end-1c")
-        line_count = code_content.count('\n') + 1
-        lines_string = "\n".join(str(i) for i in range(1, line_count + 1))
-        self.line_numbers.insert("1.0", lines_string)
-        self.line_numbers._textbox.tag_add("right", "1.0", "end")
-        self.line_numbers._textbox.tag_config("right", justify="right")
-        self.line_numbers.configure(state="disabled")
+    def refresh(self, snippets):
+        """
+        Atualiza a tela reaproveitada com a listagem recarregada do banco: a lista lateral
+        só redesenha as linhas que mudaram (mantendo filtro e rolagem), e o snippet aberto
+        é recarregado se mudou ou fechado se saiu da categoria.
+        """
+        snippets = list(snippets)
+        if snippets != self.snippets:
+            self.snippets = snippets
+            self.list_model = SnippetListModel(snippets)
+            self.side_list.update_items(self.list_model.filter(self.search_entry.get()))
+
+        current = getattr(self, 'current_snippet', None)
+        if current is None:
+            return
+        fresh = self.load_snippet(current.id) if any(s.id == current.id for s in snippets) else None
+        if fresh is None:
+            self._clear_code()
+        elif fresh != current:
+            self._display_code(fresh)
 
     def _filter_snippets(self, event=None):
-        query = self.search_entry.get().lower()
-        for item_frame in self.side_list.winfo_children():
-            btn = next((child for child in item_frame.winfo_children() if isinstance(child, ctk.CTkButton)), None)
-            if btn:
-                if query == "" or query in btn.cget("text").lower():
-                    item_frame.pack(fill="x", pady=1, padx=5)
-                else:
-                    item_frame.pack_forget()
+        query = self.search_entry.get()
+        if query.lower() == self.list_model.query:
+            return # Teclas que não mudam o texto (setas, Shift...) não redesenham a lista
+        self.side_list.set_items(self.list_model.filter(query))
 
     def _populate_list(self):
-        for child in self.side_list.winfo_children():
-            child.destroy()
-        for snip in self.snippets:
-            is_custom = snip[6] if len(snip) > 6 else 0
-            cat_origin = snip[7] if len(snip) > 7 else ""
-            
-            item_frame = ctk.CTkFrame(self.side_list, fg_color="transparent", height=35)
-            item_frame.pack(fill="x", pady=2, padx=5) 
-            item_frame.pack_propagate(False) 
-            
-            tag_text, tag_bg, tag_color = ("CUSTOM", "#E0F2FE", "#0369A1") if is_custom else ("PADRÃO", "#FFEDD5", "#C2410C")
-            ctk.CTkLabel(item_frame, text=tag_text, font=(FONT_FAMILY, 8, "bold"), width=52, height=20, fg_color=tag_bg, text_color=tag_color, corner_radius=4).pack(side="left", padx=(5, 2))
-            
-            if self.category_name == "Meus Snippets":
-                ctk.CTkLabel(item_frame, text=cat_origin.upper(), font=(FONT_FAMILY, 8, "bold"), width=70, height=20, fg_color="#F1F5F9", text_color="#64748B", corner_radius=4).pack(side="left", padx=2)
-
-            ctk.CTkButton(
-                item_frame, text=f"{snip[3].upper()} • {snip[2]}", anchor="w", 
-                fg_color="transparent", text_color=COLOR_TEXT_MAIN, hover_color="#F1F5F9", height=30, 
-                font=(FONT_FAMILY, 11, "bold" if is_custom else "normal"), 
-                command=lambda s=snip: self._display_code(s)
-            ).pack(side="left", fill="both", expand=True, padx=2)
+        self.side_list.set_items(self.list_model.filter(self.search_entry.get()))
+
+    def _create_list_row(self, parent):
+        """Widgets de uma linha da lista lateral, reaproveitados na rolagem (ver _bind_list_row)."""
+        row = ctk.CTkFrame(parent, fg_color="transparent", height=39)
+        row.pack_propagate(False)
+        item_frame = ctk.CTkFrame(row, fg_color="transparent", height=35)
+        item_frame.pack(fill="x", pady=2, padx=5) 
+        item_frame.pack_propagate(False) 
+
+        row.type_tag = ctk.CTkLabel(item_frame, text="", font=(FONT_FAMILY, 8, "bold"), width=52, height=20, corner_radius=4)
+        row.type_tag.pack(side="left", padx=(5, 2))
+
+        row.origin_tag = None
+        if self.category_name == "Meus Snippets":
+            row.origin_tag = ctk.CTkLabel(item_frame, text="", font=(FONT_FAMILY, 8, "bold"), width=70, height=20, fg_color="#F1F5F9", text_color="#64748B", corner_radius=4)
+            row.origin_tag.pack(side="left", padx=2)
+
+        row.open_btn = ctk.CTkButton(
+            item_frame, text="", anchor="w", 
+            fg_color="transparent", text_color=COLOR_TEXT_MAIN, hover_color="#F1F5F9", height=30, 
+            font=(FONT_FAMILY, 11, "normal")
+        )
+        row.open_btn.pack(side="left", fill="both", expand=True, padx=2)
+        return row
+
+    def _bind_list_row(self, row, snip):
+        is_custom = snip.is_custom
+        tag_text, tag_bg, tag_color = ("CUSTOM", "#E0F2FE", "#0369A1") if is_custom else ("PADRÃO", "#FFEDD5", "#C2410C")
+        row.type_tag.configure(text=tag_text, fg_color=tag_bg, text_color=tag_color)
+        if row.origin_tag is not None:
+            row.origin_tag.configure(text=(snip.category_name or "").upper())
+        row.open_btn.configure(
+            text=f"{snip.language.upper()} • {snip.title}",
+            font=(FONT_FAMILY, 11, "bold" if is_custom else "normal"),
+            command=lambda s=snip: self._display_code(s)
+        )
 
     def _display_code(self, snippet_data):
+        # A listagem só traz o resumo; o corpo é carregado ao abrir o snippet
+        if snippet_data.code is None:
+            snippet_data = self.load_snippet(snippet_data.id)
+            if snippet_data is None: return
+
         self.current_snippet = snippet_data
-        self.current_snip_label.configure(text=snippet_data[2])
+        self.current_snip_label.configure(text=snippet_data.title)
         
         # Atualiza a Tag de Linguagem no Header do Editor
         self.lang_tag.pack(side="left", padx=15)
-        self.lang_tag.configure(text=snippet_data[3].upper())
+        self.lang_tag.configure(text=snippet_data.language.upper())
 
+        self._cancel_display_jobs()
+        code = snippet_data.code
+        large = len(code) > self.LARGE_FILE_CHARS
         self.code_text.configure(state="normal")
         self.code_text.delete("1.0", "end")
-        self.code_text.insert("1.0", snippet_data[4])
-        self._update_line_numbers()
-        self.highlighter.apply_highlight(text_widget=self.code_text, code=snippet_data[4], lang_name=snippet_data[3])
+        # Arquivo grande: só a primeira parte agora, o resto em _insert_next_chunk
+        inserted = self._chunk_end(code, 0) if large else len(code)
+        self.code_text.insert("1.0", code[:inserted])
+        self.line_numbers.redraw()
+        if len(code) > self.PROGRESSIVE_HIGHLIGHT_CHARS:
+            self._highlight_job = self.highlighter.apply_highlight_progressive(
+                self.code_text, code, snippet_data.language, text_complete=not large
+            )
+        else:
+            self.highlighter.apply_highlight(text_widget=self.code_text, code=code, lang_name=snippet_data.language)
         self.code_text.configure(state="disabled")
+        if large:
+            self._insert_job = self.after(1, self._insert_next_chunk, code, inserted)
         
-        is_custom = snippet_data[6] if len(snippet_data) > 6 else 0
+        is_custom = snippet_data.is_custom
         if is_custom or self.is_dev_mode:
             self.edit_btn.pack(side="left", padx=5)
             self.delete_btn.pack(side="left", padx=5)
@@ -216,9 +284,55 @@ class SnippetViewer(ctk.CTkFrame):
             self.edit_btn.pack_forget()
             self.delete_btn.pack_forget()
 
+    def _clear_code(self):
+        """Volta o editor ao estado inicial (nenhum snippet aberto)."""
+        self._cancel_display_jobs()
+        del self.current_snippet
+        self.current_snip_label.configure(text="Selecione um snippet")
+        self.lang_tag.pack_forget()
+        self.edit_btn.pack_forget()
+        self.delete_btn.pack_forget()
+        self.code_text.configure(state="normal")
+        self.code_text.delete("1.0", "end")
+        self.code_text.configure(state="disabled")
+        self.line_numbers.redraw()
+
+    def _chunk_end(self, code, start):
+        """Fim da parte que começa em 'start', cortada depois de uma quebra de linha."""
+        end = start + self.INSERT_CHUNK_CHARS
+        if end >= len(code):
+            return len(code)
+        newline = code.find("\n", end)
+        return len(code) if newline == -1 else newline + 1
+
+    def _insert_next_chunk(self, code, start):
+        end = self._chunk_end(code, start)
+        self.code_text.configure(state="normal")
+        self.code_text.insert("end-1c", code[start:end])
+        self.code_text.configure(state="disabled")
+        if end < len(code):
+            self._insert_job = self.after(1, self._insert_next_chunk, code, end)
+            return
+        self._insert_job = None
+        if self._highlight_job is not None:
+            self._highlight_job.text_complete = True # Texto completo: as tags do resto podem entrar
+
+    def _cancel_display_jobs(self):
+        if self._insert_job is not None:
+            self.after_cancel(self._insert_job)
+            self._insert_job = None
+        if self._highlight_job is not None:
+            self._highlight_job.cancel()
+            self._highlight_job = None
+
+    def destroy(self):
+        self._cancel_display_jobs()
+        super().destroy()
+
     def _copy_to_clipboard(self):
-        if not pyperclip: return
-        code = self.code_text.get("1.0", "end-1c")
+        if not pyperclip or not hasattr(self, 'current_snippet'): return
+        # Do snippet, não do widget (que pode estar no meio da carga de um arquivo grande)
+        code = self.current_snippet.code
         if code.strip():
             pyperclip.copy(code)
             self.copy_btn.configure(text="✅ Copiado!", fg_color="#10B981")
@@ -226,15 +340,15 @@ class SnippetViewer(ctk.CTkFrame):
 
     def _trigger_export(self):
         if hasattr(self, 'current_snippet'):
-            cat_to_export = self.current_snippet[7] if len(self.current_snippet) > 7 else self.category_name
+            cat_to_export = self.current_snippet.category_name or self.category_name
             export_data = {
-                "title": self.current_snippet[2], 
-                "language": self.current_snippet[3], 
-                "code": self.current_snippet[4], 
-                "version": self.current_snippet[5], 
+                "title": self.current_snippet.title, 
+                "language": self.current_snippet.language, 
+                "code": self.current_snippet.code, 
+                "version": self.current_snippet.version, 
                 "category": cat_to_export
             }
-            path = filedialog.asksaveasfilename(defaultextension=".codekit", initialfile=f"{self.current_snippet[2]}.codekit", filetypes=[("CodeKit Files", "*.codekit")])
+            path = filedialog.asksaveasfilename(defaultextension=".codekit", initialfile=f"{self.current_snippet.title}.codekit", filetypes=[("CodeKit Files", "*.codekit")])
             if path:
                 with open(path, "w", encoding="utf-8") as f: json.dump(export_data, f, indent=4, ensure_ascii=False)
                 messagebox.showinfo("Sucesso", "Exportado!")
@@ -244,7 +358,7 @@ class SnippetViewer(ctk.CTkFrame):
         if path:
             with open(path, "r", encoding="utf-8") as f: data = json.load(f)
             if all(k in data for k in ["title", "language", "code"]):
-                import_data = (None, None, data["title"], data["language"], data["code"], data.get("version", ""), 1)
+                import_data = SnippetRecord(None, None, data["title"], data["language"], data["code"], data.get("version", ""), 1, None)
                 if self.on_edit: self.on_edit(import_data)
 
     def _trigger_edit(self):
@@ -252,5 +366,5 @@ class SnippetViewer(ctk.CTkFrame):
 
     def _trigger_delete(self):
         if hasattr(self, 'current_snippet') and self.on_delete:
-            if messagebox.askyesno("Excluir", f"Deseja excluir '{self.current_snippet[2]}'?"):
-                self.on_delete(self.current_snippet[0], self.category_name)
\ No newline at end of file
+            if messagebox.askyesno("Excluir", f"Deseja excluir '{self.current_snippet.title}'?"):
+                self.on_delete(self.current_snippet.id, self.category_name)
\ No newline at end of file
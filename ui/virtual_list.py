@@ -0,0 +1,161 @@
+import sys
+import tkinter as tk
+import customtkinter as ctk
+from ui.styles import *
+
+
+class VirtualList(ctk.CTkFrame):
+    """
+    Lista virtualizada de altura fixa por linha: só existem widgets para as linhas
+    visíveis (mais duas), e eles são reaproveitados durante a rolagem, recebendo os
+    dados da nova posição. O custo de exibir 10 ou 10.000 itens é o mesmo.
+
+    create_row(parent) cria o widget de uma linha (uma única vez por linha do pool),
+    já com height=row_height no construtor (o CTk não aceita altura no place);
+    bind_row(row, item) preenche esse widget com um item da lista.
+    on_need_more() é chamado quando a rolagem se aproxima do fim, para carregar mais itens.
+    """
+
+    def __init__(self, master, row_height, create_row, bind_row, on_need_more=None,
+                 empty_text="", **kwargs):
+        super().__init__(master, **kwargs)
+
+        self.row_height = row_height
+        self.create_row = create_row
+        self.bind_row = bind_row
+        self.on_need_more = on_need_more
+
+        self.items = []
+        self._offset = 0            # rolagem em pixels
+        self._rows = []             # pool de widgets de linha
+        self._bound = []            # (índice, item) exibido por cada linha do pool
+        self._more_requested = False
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y", padx=(0, 4), pady=6)
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True, padx=(6, 0), pady=6)
+        self.body.bind("<Configure>", lambda e: self._render())
+
+        self.empty_label = ctk.CTkLabel(self.body, text=empty_text, font=(FONT_FAMILY, 14), text_color="#64748B")
+
+        self._bind_wheel(self.body)
+
+    # --- Dados ---
+
+    def set_items(self, items):
+        """Troca todo o conteúdo e volta ao topo."""
+        self.items = list(items)
+        self._offset = 0
+        self._more_requested = False
+        self._bound = [None] * len(self._rows)
+        self._render()
+
+    def update_items(self, items):
+        """
+        Troca o conteúdo mantendo a posição da rolagem: só as linhas cujo item mudou
+        são preenchidas de novo (ex: lista recarregada depois de editar um snippet).
+        """
+        self.items = list(items)
+        self._more_requested = False
+        max_offset = max(0, len(self.items) * self.row_height - self._viewport_height())
+        self._offset = min(self._offset, max_offset)
+        self._render()
+
+    def append_items(self, items):
+        """Acrescenta itens no fim (próxima página), mantendo a posição da rolagem."""
+        self.items.extend(items)
+        self._more_requested = False
+        self._render()
+
+    # --- Rolagem ---
+
+    def _viewport_height(self):
+        # winfo_height vem em pixels reais; row_height e o place usam a escala do CTk
+        return int(self.body.winfo_height() / ctk.ScalingTracker.get_widget_scaling(self))
+
+    def scroll_to(self, offset):
+        max_offset = max(0, len(self.items) * self.row_height - self._viewport_height())
+        offset = int(min(max(offset, 0), max_offset))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        total = len(self.items) * self.row_height
+        if action == "moveto":
+            self.scroll_to(float(value) * total)
+        elif unit == "pages":
+            self.scroll_to(self._offset + int(value) * self._viewport_height())
+        else:
+            self.scroll_to(self._offset + int(value) * self.row_height)
+
+    def _on_wheel(self, event):
+        if event.num == 4:
+            steps = -1
+        elif event.num == 5:
+            steps = 1
+        elif sys.platform == "darwin":
+            steps = -event.delta
+        else:
+            steps = -event.delta // 120
+        self.scroll_to(self._offset + steps * self.row_height)
+        return "break"
+
+    def _bind_wheel(self, widget):
+        """Liga a roda do mouse no widget e em todos os filhos (as linhas cobrem o corpo)."""
+        # bind do Tk em cada widget real: o bind do CTk repassaria aos filhos internos,
+        # que a recursão também visita, e a rolagem contaria em dobro
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tk.Misc.bind(widget, sequence, self._on_wheel, add="+")
+        for child in widget.winfo_children():
+            self._bind_wheel(child)
+
+    # --- Desenho ---
+
+    def _render(self):
+        height = self._viewport_height()
+        total = len(self.items) * self.row_height
+        if height <= 1:
+            return # Ainda não foi desenhado; o <Configure> chama de novo
+
+        if not self.items:
+            for row in self._rows:
+                row.place_forget()
+            self.empty_label.place(relx=0.5, y=40, anchor="n")
+            self.scrollbar.set(0, 1)
+            return
+        self.empty_label.place_forget()
+
+        # Duas linhas a mais cobrem as parcialmente visíveis no topo e no fim
+        needed = height // self.row_height + 2
+        while len(self._rows) < needed:
+            row = self.create_row(self.body)
+            self._bind_wheel(row)
+            self._rows.append(row)
+            self._bound.append(None)
+
+        first, shift = divmod(self._offset, self.row_height)
+        for slot, row in enumerate(self._rows):
+            index = first + slot
+            if slot >= needed or index >= len(self.items):
+                row.place_forget()
+                self._bound[slot] = None
+                continue
+            bound = (index, self.items[index])
+            if self._bound[slot] != bound:
+                self.bind_row(row, self.items[index])
+                self._bound[slot] = bound
+            row.place(x=0, y=slot * self.row_height - shift, relwidth=1)
+
+        if total <= height:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._offset / total, (self._offset + height) / total)
+
+        # Perto do fim: pede a próxima página (uma vez por carga)
+        last_visible = first + needed
+        if self.on_need_more and not self._more_requested and last_visible >= len(self.items) - needed:
+            self._more_requested = True
+            self.on_need_more()